@@ -1,9 +1,24 @@
 from typing import Callable, Any, Literal
+from collections import OrderedDict
+from functools import wraps
 from colorsys import hls_to_rgb
 from numba import njit
-import pygame.gfxdraw
+from numba.core.errors import NumbaError
+from numba.extending import intrinsic
+from numba import types as nbtypes
+import pygame.surfarray
+import numpy as np
 import pygame
+import multiprocessing
+import importlib
+import keyword
+import ast
+import hashlib
+import threading
+import pickle
+import queue
 import types
+import sys
 import time
 import math
 import json
@@ -19,7 +34,9 @@ def cache(ignore=None) -> Callable:
     ignore = set() if ignore is None else set(ignore)
     def decorator(callback):
         _cache = {}
+        counts = [0, 0]  # lookups, misses
 
+        @wraps(callback)
         def wrapper(*args):
             # Avoid building tuple if no ignore — fast path
             if ignore:
@@ -27,15 +44,112 @@ def cache(ignore=None) -> Callable:
             else:
                 key = args  # args is already a tuple, no need to rebuild
 
+            counts[0] += 1
             if key not in _cache:
+                counts[1] += 1
                 _cache[key] = callback(*args)
 
             return _cache[key]
 
+        def stats() -> dict:
+            lookups, misses = counts
+            return {
+                'entries': len(_cache),
+                'hits': lookups - misses,
+                'misses': misses,
+                'hit_rate': (lookups - misses) / lookups if lookups else 0.0
+            }
+
+        wrapper.clear = _cache.clear
+        wrapper.stats = stats
         return wrapper
 
     return decorator
 
+class SurfaceCache:
+    """
+        LRU cache for surfaces (or arrays) bounded by a byte budget.
+
+        Args:
+            budget: Maximum total size of the cached values in bytes.
+            copy: Return a copy on every hit. With copy=False the cached value
+                  itself is returned and must be treated as read-only.
+    """
+    __slots__ = ['budget', 'copy', 'size', 'hits', 'misses', 'evictions', '_entries']
+
+    def __init__(self, budget=64 * 1024 * 1024, copy=True):
+        self.budget = budget
+        self.copy = copy
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries = OrderedDict()  # key -> (value, size)
+
+    @staticmethod
+    def sizeof(value) -> int:
+        if isinstance(value, pygame.Surface):
+            return value.get_pitch() * value.get_height()
+        return getattr(value, 'nbytes', 0)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return entry[0].copy() if self.copy else entry[0]
+
+    def put(self, key, value):
+        self.pop(key)
+
+        size = self.sizeof(value)
+        if size > self.budget:
+            return
+
+        self._entries[key] = value, size
+        self.size += size
+
+        # Evict least recently used entries
+        while self.size > self.budget:
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.size -= evicted
+            self.evictions += 1
+
+    def pop(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size -= entry[1]
+
+    def discard(self, match):
+        """Drops every entry whose key passes match(key)"""
+        for key in [key for key in self._entries if match(key)]:
+            self.pop(key)
+
+    def clear(self):
+        self._entries.clear()
+        self.size = 0
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            'entries': len(self._entries),
+            'bytes': self.size,
+            'budget': self.budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': self.hits / lookups if lookups else 0.0
+        }
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
 pi        = math.pi
 sin       = math.sin
 cos       = math.cos
@@ -69,19 +183,75 @@ def sum_ints(*args) -> list[int]:
     return result
 
 fonts = {}
+
+# Bundled font files by (bold, italic), (False, False) is the regular face
+fontFiles = {}
+
+def registerFont(path, bold=False, italic=False) -> None:
+    """
+        Uses a font file instead of pygame's default font.
+
+        Styles without their own file are synthesized from the regular face.
+    """
+    fontFiles[bold, italic] = path
+
+    # Everything measured or rendered with the old font is stale
+    fonts.clear()
+    glyphAdvances.clear()
+    textCache.clear()
+    textSize.clear()
+
 def getFont(size,bold=False,italic=False) -> Any | pygame.font.Font:
-    size *= 1.5
     if (size,bold,italic) in fonts:
         return fonts[size,bold,italic]
 
-    font = pygame.font.SysFont(None, int(size))
+    if not pygame.font.get_init():
+        pygame.font.init()
+
+    # Font files are loaded directly, no system font lookup
+    if (bold,italic) in fontFiles:
+        font = pygame.font.Font(fontFiles[bold,italic], int(size * 1.5))
+    else:
+        font = pygame.font.Font(fontFiles.get((False,False)), int(size * 1.5))
+        font.set_bold(bold)
+        font.set_italic(italic)
+
     fonts[size,bold,italic] = font
     return font
 
+def preloadFonts(sizes, styles=((False, False),)) -> None:
+    """Creates fonts ahead of time so the first frame using them doesn't hitch"""
+    for size in sizes:
+        for bold, italic in styles:
+            getFont(size, bold, italic)
+
+# Rendered text lines by (text, size, color, bold, italic)
+textCache = SurfaceCache(16 * 1024 * 1024, copy=False)
+
+# Glyph advance tables by (size, bold, italic)
+glyphAdvances = {}
+
+def _advances(line, size, bold, italic) -> list[int]:
+    table = glyphAdvances.setdefault((size, bold, italic), {})
+    if missing := set(line).difference(table):
+        font = getFont(size, bold, italic)
+        for char in missing:
+            table[char] = font.size(char)[0]
+
+    return [table[char] for char in line]
+
+def _renderLine(line, size, color, bold, italic) -> pygame.Surface:
+    key = line, size, color, bold, italic
+    surf = textCache.get(key)
+    if surf is None:
+        surf = getFont(size, bold, italic).render(line, True, color)
+        textCache.put(key, surf)
+    return surf
+
 def drawText(text: str, x: int, y: int, size=10, color=(255, 255, 255), bold=False, italic=False) -> None:
-    font = getFont(size, bold, italic)
     screen_height = game.height * game.res
     screen_width = game.width * game.res
+    color = tuple(color)
 
     for i, line in enumerate(text.splitlines()):
         if not line:
@@ -93,56 +263,283 @@ def drawText(text: str, x: int, y: int, size=10, color=(255, 255, 255), bold=Fal
         if render_y >= screen_height or render_y + size < 0:
             continue
 
+        # Fully visible lines are drawn straight from the cache
+        if x >= 0:
+            surf = _renderLine(line, size, color, bold, italic)
+            if x + surf.get_width() <= screen_width:
+                drawn = game.disp.blit(surf, (x, render_y))
+                game.markDirty(drawn, ('text', line, size, color, bold, italic))
+                continue
+
         # Character-by-character horizontal culling
         char_x = x
-        visible_chars = []
+        visible_start = None
+        visible_end = 0
         visible_start_x = None
 
-        for char in line:
-            char_width = textSize(char, size)[0]
+        for j, char_width in enumerate(_advances(line, size, bold, italic)):
             char_end_x = char_x + char_width
 
             # Check if character is visible
             if char_end_x > 0 and char_x < screen_width:
-                if visible_start_x is None:
+                if visible_start is None:
+                    visible_start = j
                     visible_start_x = char_x
-                visible_chars.append(char)
+                visible_end = j + 1
             elif char_x >= screen_width:
                 # Past right edge, no more visible chars
                 break
 
             char_x = char_end_x
 
-        if visible_chars and visible_start_x is not None:
-            visible_text = ''.join(visible_chars)
-            surf = font.render(visible_text, True, color)
-            game.disp.blit(surf, (visible_start_x, render_y))
+        if visible_start is not None:
+            visible_text = line[visible_start:visible_end]
+            surf = _renderLine(visible_text, size, color, bold, italic)
+            drawn = game.disp.blit(surf, (visible_start_x, render_y))
+            game.markDirty(drawn, ('text', visible_text, size, color, bold, italic))
 
 def drawRect(rect, color, width=0, border_radius=0) -> None:
-    pygame.draw.rect(game.disp, color, rect, width, border_radius)
+    drawn = pygame.draw.rect(game.disp, color, rect, width, border_radius)
+    game.markDirty(drawn, ('rect', color, width, border_radius))
 
 def drawLine(start, end, color, width=1) -> None:
-    pygame.draw.line(game.disp, color, start, end, width)
+    drawn = pygame.draw.line(game.disp, color, start, end, width)
+    game.markDirty(drawn, ('line', tuple(start), tuple(end), color, width))
 
 
 ### Shader Functions ###
+def shaderName(shader) -> str:
+    return getattr(shader, '_name', None) or getattr(shader, '__name__', None) or repr(shader)
+
+class ShaderProfiler:
+    """
+        Per-shader timings, collected on sampled frames.
+
+        Only every sample-th frame is measured, on other frames the shading paths
+        skip instrumentation after checking the active flag.
+        Runs of per-pixel shaders are fused, they are timed together under their joined names.
+
+        Args:
+            sample: Measure one frame out of this many.
+    """
+    __slots__ = ['enabled', 'sample', 'active', 'frames', '_stats']
+
+    def __init__(self, sample=10):
+        self.enabled = False
+        self.sample = sample
+        self.active = False
+        self.frames = 0
+        self._stats = {}  # shaders -> [calls, pixels, seconds]
+
+    def startFrame(self, frame):
+        self.active = self.enabled and frame % self.sample == 0
+        if self.active:
+            self.frames += 1
+
+    def record(self, shaders, pixels, seconds):
+        entry = self._stats.get(shaders)
+        if entry is None:
+            entry = self._stats[shaders] = [0, 0, 0.0]
+
+        entry[0] += 1
+        entry[1] += pixels
+        entry[2] += seconds
+
+    def report(self) -> list[dict]:
+        """
+            Returns the measurements, slowest first.
+
+            Times are totals over the sampled frames, frame_time is the average per sampled frame.
+            cache_hit_rate is None for shaders without the cache option.
+        """
+        rows = []
+        for shaders, (calls, pixels, seconds) in self._stats.items():
+            caches = [shader.stats() for shader in shaders if callable(getattr(shader, 'stats', None))]
+            lookups = sum(stats['hits'] + stats['misses'] for stats in caches)
+
+            rows.append({
+                'name': ' + '.join(map(shaderName, shaders)),
+                'calls': calls,
+                'pixels': pixels,
+                'time': seconds,
+                'frame_time': seconds / self.frames if self.frames else seconds,
+                'pixel_time': seconds / pixels if pixels else 0.0,
+                'cache_hit_rate': sum(stats['hits'] for stats in caches) / lookups if lookups else None
+            })
+
+        return sorted(rows, key=lambda row: row['time'], reverse=True)
+
+    def reset(self):
+        self._stats.clear()
+        self.frames = 0
+
+profiler = ShaderProfiler()
+
 # Cache for static shader surfaces
-_static_shader_cache = {}
+staticShaderCache = SurfaceCache()
+
+def clearStaticShaderCache():
+    """Drops every cached static shader surface, eg. after changing shader args"""
+    staticShaderCache.clear()
+
+def make_hashable(obj):
+    # Convert to hashable tuple of sorted items, converting lists to tuples
+    if isinstance(obj, list):
+        return tuple(make_hashable(item) for item in obj)
+    elif isinstance(obj, dict):
+        return tuple(sorted((k, make_hashable(v)) for k, v in obj.items()))
+    return obj
+
+class ShaderRegistry:
+    """
+        Caches parsed shader.json files and compiled shader code.
+
+        Entries are keyed by path and reused while the file's mtime and size
+        are unchanged, so reloading an unchanged shader pack doesn't touch the parser or compiler.
+        Returned metadata is shared, don't modify it.
+    """
+    __slots__ = ['_meta', '_code']
 
-def load_as_module(source, name, globals=None) -> types.ModuleType:
+    def __init__(self):
+        self._meta = {}
+        self._code = {}
+
+    @staticmethod
+    def stamp(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def meta(self, path) -> dict:
+        stamp = self.stamp(path)
+        entry = self._meta.get(path)
+
+        if entry is None or entry[0] != stamp:
+            with open(path) as f:
+                entry = self._meta[path] = (stamp, json.load(f))
+
+        return entry[1]
+
+    def code(self, path) -> tuple[str, types.CodeType]:
+        """Returns (source, code object) of a shader file"""
+        stamp = self.stamp(path)
+        entry = self._code.get(path)
+
+        if entry is None or entry[0] != stamp:
+            with open(path) as f:
+                source = f.read()
+            entry = self._code[path] = (stamp, source, compile(source, path, 'exec'))
+
+        return entry[1:]
+
+    def expression(self, path) -> list[tuple[str, str]]:
+        """Returns the (name, expression) assignments of an expression shader file"""
+        stamp = self.stamp(path)
+        entry = self._code.get(path)
+
+        if entry is None or entry[0] != stamp:
+            with open(path) as f:
+                entry = self._code[path] = (stamp, parseExpressions(f.read()))
+
+        return entry[1]
+
+    def clear(self):
+        self._meta.clear()
+        self._code.clear()
+
+shaderRegistry = ShaderRegistry()
+
+def load_as_module(source, name, globals=None, filename=None) -> types.ModuleType:
     # sourcery skip: avoid-builtin-shadow
+    # source can be text or an already compiled code object
     if globals is None:
         globals = {}
     module = types.ModuleType(name)
     module.__dict__.update(globals)
+    if not isinstance(source, types.CodeType):
+        source = compile(source, filename or name, 'exec')
     exec(source, module.__dict__)
     return module
 
-def loadShaderMeta(shader_pack) -> tuple[Literal['Error'], str] | Any:
-    metapath = os.path.join(shader_pack, 'shader.json')
+# numba dispatchers by jit module name, keeps compiled code across reloads
+_jitDispatchers = {}
 
-    with open(metapath) as f:
-        meta = json.load(f)
+def jitShader(shader_func, source, path, globals=None) -> Callable:
+    """
+        Compiles a shader in nopython mode with numba.
+
+        Machine code is cached on disk in the shader pack's __pycache__, keyed by
+        the shader source and its globals (numba freezes globals into the compiled
+        code). If the shader can't be compiled the interpreted version is used.
+
+        Args:
+            shader_func: The loaded shader, a plain function or an njit dispatcher.
+            source: Source code of the shader file.
+            path: Path of the shader file.
+            globals: Globals the shader was loaded with.
+    """
+    if globals is None:
+        globals = {}
+
+    # Only globals the shader refers to end up in the compiled code
+    names = set()
+    pending = [compile(source, path, 'exec')]
+    while pending:
+        code = pending.pop()
+        names.update(code.co_names)
+        pending += [const for const in code.co_consts if isinstance(const, types.CodeType)]
+
+    values = sorted((k, v) for k, v in globals.items() if k in names and not isinstance(v, types.ModuleType))
+    digest = hashlib.sha1(f'{source}\n{values!r}'.encode()).hexdigest()[:16]
+
+    # numba's cache is tied to a source file, so each source/globals pair gets its own copy
+    cache_dir = os.path.join(os.path.dirname(path), '__pycache__')
+    stem = os.path.splitext(os.path.basename(path))[0]
+    jit_path = os.path.join(cache_dir, f'{stem}.jit-{digest}.py')
+
+    if not os.path.exists(jit_path):
+        os.makedirs(cache_dir, exist_ok=True)
+
+        # Remove copies and compiled code for older versions of the shader
+        for folder in (cache_dir, os.path.join(cache_dir, '__pycache__')):
+            if os.path.isdir(folder):
+                for name in os.listdir(folder):
+                    if name.startswith(f'{stem}.jit-'):
+                        os.remove(os.path.join(folder, name))
+
+        with open(jit_path, 'w') as f:
+            f.write(source)
+
+    # Cached code is relinked to its module by name when loaded
+    module_name = f'_shader_{stem}_{digest}'
+    if module_name not in sys.modules:
+        sys.modules[module_name] = load_as_module(source, module_name, globals, jit_path)
+
+    py_func = sys.modules[module_name].shader
+    py_func = getattr(py_func, 'py_func', py_func)
+
+    if module_name not in _jitDispatchers:
+        _jitDispatchers[module_name] = njit(cache=True)(py_func)
+    impl = _jitDispatchers[module_name]
+
+    # numba compiles on the first call, that's where a failure shows up
+    def jitted(*args):
+        nonlocal impl
+        try:
+            return impl(*args)
+        except NumbaError as e:
+            if impl is py_func:
+                raise
+            print(f'Could not compile shader {path}, using the interpreter: {e}')
+            impl = py_func
+            jitted._dispatcher = None
+            return impl(*args)
+
+    jitted.py_func = py_func
+    jitted._dispatcher = impl  # Lets fused kernels call the compiled shader directly
+    return jitted
+
+def loadShaderMeta(shader_pack) -> tuple[Literal['Error'], str] | Any:
+    meta = shaderRegistry.meta(os.path.join(shader_pack, 'shader.json'))
 
     require = meta['require']
 
@@ -170,7 +567,8 @@ def loadShaderFile(shader_pack, shader_file, globals=None):
     if isinstance(meta, tuple) and meta[0] == 'Error':
         return meta  # propagate error
 
-    shader_meta = next((s for s in meta['shaders'] if s['filename'] == shader_file), None)
+    # Inline expression shaders are identified by name
+    shader_meta = next((s for s in meta['shaders'] if shader_file in (s.get('filename'), s.get('name'))), None)
 
     if shader_meta.get('args'):
         if missing_args := [
@@ -178,38 +576,60 @@ def loadShaderFile(shader_pack, shader_file, globals=None):
         ]:
             return 'Error', f'Shader {shader_file} missing {len(missing_args)} arguments: {str(missing_args).strip("[]")}'
 
-    with open(os.path.join(shader_pack, shader_file)) as f:
-        try:
-            module = load_as_module(f.read(), f.name, globals)
-            shader_func = module.shader
-
-            if shader_meta.get('cache', False):
-                shader_func = cache(ignore=shader_meta.get('ignore_args', []))(shader_func)
-
-            # Build static cache key from args (excluding 'gl')
-            static_cache_key = None
-            if shader_meta.get('static', False):
-                cache_args = {k: v for k, v in globals.items() if k != 'gl' and k in shader_meta.get('args', [])}
-                # Convert to hashable tuple of sorted items, converting lists to tuples
-                def make_hashable(obj):
-                    if isinstance(obj, list):
-                        return tuple(make_hashable(item) for item in obj)
-                    elif isinstance(obj, dict):
-                        return tuple(sorted((k, make_hashable(v)) for k, v in obj.items()))
-                    return obj
-                static_cache_key = (shader_pack, shader_file, make_hashable(cache_args))
-
-            # Attach metadata to the function
-            shader_func._static = shader_meta.get('static', False)
-            shader_func._static_cache_key = static_cache_key
-
-            return shader_func
+    path = os.path.join(shader_pack, shader_file)
+    expression = 'expr' in shader_meta or shader_file.endswith('.expr')
+    try:
+        if expression:
+            assignments = list(shader_meta['expr'].items()) if 'expr' in shader_meta else shaderRegistry.expression(path)
+            shader_func = compileExpression(assignments, shader_meta.get('uniforms', {}), shader_file)
 
-        except Exception as e:
-            print(f'Error while loading shader {shader_file}: {e}')
-            return
+        else:
+            source, code = shaderRegistry.code(path)
+            shader_func = load_as_module(code, path, globals).shader
+
+        if shader_meta.get('jit', False) and not expression:
+            shader_func = jitShader(shader_func, source, path, globals)
+
+        if shader_meta.get('cache', False):
+            shader_func = cache(ignore=shader_meta.get('ignore_args', []))(shader_func)
+
+        # Build static cache key from args (excluding 'gl')
+        static_cache_key = None
+        if shader_meta.get('static', False):
+            cache_args = {k: v for k, v in globals.items() if k != 'gl' and k in shader_meta.get('args', [])}
+            static_cache_key = (shader_pack, shader_file, make_hashable(cache_args))
+
+        # Attach metadata to the function
+        shader_func._static = shader_meta.get('static', False)
+        shader_func._static_cache_key = static_cache_key
+        shader_func._vectorized = shader_meta.get('vectorized', False) or expression
+        shader_func._frame_independent = shader_meta.get('frame_independent', False)
+
+        shader_func._name = f'{os.path.basename(os.path.normpath(shader_pack))}/{shader_file}'
+
+        # Used by ShaderWatcher to load the shader again
+        shader_func._load = (shader_pack, shader_file, globals)
+
+        # Uniforms and their defaults, values come from Game.uniforms
+        shader_func._uniforms = shader_meta.get('uniforms', {})
+
+        # Pure shaders can be reloaded in worker processes from their source
+        shader_func._pure = shader_meta.get('pure', False)
+        shader_func._source = (
+            shader_pack, shader_file, os.path.getmtime(path) if os.path.exists(path) else None,
+            {k: v for k, v in globals.items() if not isinstance(v, types.ModuleType)},
+            {k: v.__name__ for k, v in globals.items() if isinstance(v, types.ModuleType)},
+            shader_meta.get('ignore_args', []) if shader_meta.get('cache', False) else None,
+            shader_meta.get('jit', False)
+        )
+
+        return shader_func
 
-def loadShaders(shader_pack, shader_index=None):
+    except Exception as e:
+        return 'Error', f'Shader {shader_file} failed to load: {e}'
+
+def loadShaders(shader_pack, shader_index=None, globals=None):
+    # sourcery skip: avoid-builtin-shadow
     meta = loadShaderMeta(shader_pack)
     if not isinstance(meta, dict):
         return meta
@@ -224,13 +644,14 @@ def loadShaders(shader_pack, shader_index=None):
             if shader['type'] not in {'background','sprite'}:
                 return 'Error', f'Unsupported shader type: {shader["type"]}'
 
-            shader_func, cache = loadShaderFile(shader_pack, shader['filename'])
+            # loadShaderFile already applies the 'cache' option
+            shader_func = loadShaderFile(shader_pack, shader.get('filename') or shader['name'], globals)
 
             if shader['type'] == 'background':
-                bg_shaders.append((shader_func, cache))
+                bg_shaders.append(shader_func)
 
             elif shader['type'] == 'sprite':
-                sprite_shaders.append((shader_func, cache))
+                sprite_shaders.append(shader_func)
 
         return meta, bg_shaders, sprite_shaders
 
@@ -239,7 +660,668 @@ def loadShaders(shader_pack, shader_index=None):
     if shader['type'] not in {'background','sprite'}:
         return 'Error', f'Unsupported shader type: {shader["type"]}'
 
-    return loadShaderFile(shader_pack, shader['filename'])
+    return loadShaderFile(shader_pack, shader.get('filename') or shader['name'], globals)
+
+@cache()
+def coordGrid(width, height, step=1) -> tuple[np.ndarray, np.ndarray]:
+    """
+        Returns read-only (x, y) coordinate grids of shape (width, height).
+
+        Grids are indexed [x, y] like pygame.surfarray and shared between callers.
+        With step > 1 the grids hold every step-th coordinate (reduced resolution).
+    """
+    xs, ys = np.indices((width, height)) * step
+    xs.flags.writeable = False
+    ys.flags.writeable = False
+    return xs, ys
+
+@intrinsic
+def _unwrap(typingctx, value):
+    # Optional(T) -> T inside fused kernels, numba doesn't narrow after an "is None" check
+    target = value.type if isinstance(value, nbtypes.Optional) else value
+
+    def codegen(context, builder, sig, args):
+        return context.cast(builder, args[0], sig.args[0], sig.return_type)
+
+    return target(value), codegen
+
+def _fusedSource(arg_counts, colors, kernel) -> str:
+    # Pixel loop with the shader calls written out, stage i is s{i} with extra arguments a{i}_{j}
+    lines = ['def run(cl, dl, xl, yl, rl, frame, args):']
+    lines += [f'    {"".join(f"a{i}_{j}, " for j in range(n))}= args[{i}]' for i, n in enumerate(arg_counts) if n]
+
+    if kernel:
+        lines += [
+            '    for y in range(xl.shape[1]):',
+            '        for x in range(xl.shape[0]):',
+            '            if not dl[x, y]:',
+            '                continue',
+            f'            c = {"(cl[x, y, 0], cl[x, y, 1], cl[x, y, 2])" if colors else "None"}',
+            '            px = xl[x, y]',
+            '            py = yl[x, y]'
+        ]
+    else:
+        lines += [
+            '    for y in range(len(xl[0]) if xl else 0):',
+            '        for x in range(len(xl)):',
+            '            if not dl[x][y]:',
+            '                continue',
+            f'            c = {"tuple(cl[x][y])" if colors else "None"}',
+            '            px = xl[x][y]',
+            '            py = yl[x][y]'
+        ]
+
+    for i, n in enumerate(arg_counts):
+        extra = ''.join(f', a{i}_{j}' for j in range(n))
+        lines += [
+            f'            c = s{i}(c, px, py, frame{extra})',
+            '            if c is None:',
+            f'                {"dl[x, y]" if kernel else "dl[x][y]"} = False',
+            '                continue'
+        ]
+        if kernel:
+            lines.append('            c = _unwrap(c)')
+
+    if kernel:
+        lines += [f'            rl[x, y, {k}] = c[{k}]' for k in range(3)]
+    else:
+        lines.append('            rl[x][y] = tuple(c)[:3]')
+
+    return '\n'.join(lines) + '\n'
+
+def _fuse(shaders, arg_counts, colors, kernel) -> Callable:
+    if kernel:
+        stages = {f's{i}': shader._dispatcher for i, shader in enumerate(shaders)}
+    else:
+        stages = {f's{i}': shader for i, shader in enumerate(shaders)}
+
+    module = load_as_module(_fusedSource(arg_counts, colors, kernel), '<fused shaders>', {**stages, '_unwrap': _unwrap})
+    return njit(module.run) if kernel else module.run
+
+# Fused runs by (shaders, extra argument counts, has input colors), ShaderWatcher drops reloaded ones
+_fusedRuns = {}
+
+def fuseShaders(shaders, arg_counts, colors=False) -> Callable:
+    """
+        Fuses a run of per-pixel shaders into one function with the pixel loop inside.
+
+        The stages are called back to back without a Python loop over the chain,
+        a None result still stops the chain for that pixel. When every stage is
+        jitted the run is compiled into a single numba kernel instead, falling
+        back to the Python version if that fails.
+
+        Args:
+            shaders: The shader run.
+            arg_counts: Number of extra arguments each shader takes.
+            colors: Whether the run gets input colors. (False for background passes)
+
+        Returns:
+            run(colors, drawn, xs, ys, frame, args) -> int16 (w, h, 3) colors,
+            drawn is updated in place.
+    """
+    key = (tuple(shaders), tuple(arg_counts), colors)
+    if key in _fusedRuns:
+        return _fusedRuns[key]
+
+    python = _fuse(shaders, arg_counts, colors, False)
+
+    def run_python(colors, drawn, xs, ys, frame, args):
+        width, height = xs.shape
+        dl = drawn.tolist()
+        rl = np.zeros((width, height, 3), np.int16).tolist() if colors is None else colors[..., :3].tolist()
+
+        # Each pixel's input color is read before it's overwritten, so rl doubles as the input
+        python(rl, dl, xs.tolist(), ys.tolist(), rl, frame, args)
+
+        drawn[:] = dl
+        return np.clip(np.array(rl).reshape(width, height, 3), -32768, 32767).astype(np.int16)
+
+    run = run_python
+
+    if all(getattr(shader, '_dispatcher', None) is not None for shader in shaders):
+        kernel = _fuse(shaders, arg_counts, colors, True)
+
+        def run(colors, drawn, xs, ys, frame, args):
+            nonlocal kernel
+            if kernel is not None:
+                result = np.zeros((*xs.shape, 3), np.int16) if colors is None else colors[..., :3].copy()
+                mask = drawn.copy()
+                try:
+                    kernel(result, mask, xs, ys, result, frame, tuple(args))
+                    drawn[:] = mask
+                    return result
+
+                except NumbaError as e:
+                    print(f'Could not compile fused shader kernel, using the interpreter: {e}')
+                    kernel = None
+
+            return run_python(colors, drawn, xs, ys, frame, args)
+
+    _fusedRuns[key] = run
+    return run
+
+def _shadePixels(shaders, colors, drawn, xs, ys, frame, args):
+    # Per-pixel path for a run of scalar shaders, args holds each shader's extra arguments
+    run = fuseShaders(shaders, [len(extra) for extra in args], colors is not None)
+    return run(colors, drawn, xs, ys, frame, args)
+
+def _colorArray(result, shape) -> np.ndarray:
+    # Normalizes a vectorized shader result to an int16 (*shape, 3 or 4) array
+    if isinstance(result, (tuple, list)):
+        result = np.stack(np.broadcast_arrays(*result), axis=-1)
+
+    result = np.asarray(result)
+    return np.clip(np.broadcast_to(result, (*shape, result.shape[-1])), 0, 255).astype(np.int16)
+
+def uniformArgs(shader, uniforms=None) -> tuple:
+    """Returns the values of the uniforms a shader declares, in declaration order"""
+    if uniforms is None:
+        uniforms = {}
+    return tuple(uniforms.get(name, default) for name, default in getattr(shader, '_uniforms', {}).items())
+
+def shadeGrid(shaders, xs, ys, frame, colors=None, args=(), pool=None, uniforms=None, profile=True, batch_grid=None) -> tuple[np.ndarray, np.ndarray] | None:
+    """
+        Runs a shader chain over a grid of coordinates.
+
+        Vectorized shaders (shader._vectorized) are called once with whole arrays:
+        shader(colors, xs, ys, frame, *args, *uniforms) -> (w, h, 3) array, (r, g, b) arrays or None.
+        Incoming colors are int16 (w, h, 3) arrays, or None at the start of a background pass.
+        Runs of per-pixel shaders are called once per pixel, a None return
+        stops the chain for that pixel and leaves it undrawn.
+
+        Args:
+            shaders: The shader chain.
+            xs, ys: Coordinate grids of shape (w, h).
+            frame: The current frame.
+            colors: Optional (w, h, 3) input colors. (None for background passes)
+            args: Extra arguments passed to every shader.
+            pool: Optional ShaderPool for runs of pure per-pixel shaders.
+            uniforms: Uniform values by name, shaders get the ones they declare after args.
+            profile: Whether sampled frames record this pass in the profiler.
+            batch_grid: Optional (xs, ys) passed to vectorized shaders instead, eg. world coordinates.
+
+        Returns:
+            (colors, drawn) where drawn is a (w, h) bool mask, or None if a
+            vectorized shader skipped the whole grid.
+    """
+    drawn = np.ones(xs.shape, bool)
+
+    # Work in int16 so shaders can do arithmetic without uint8 wraparound
+    if colors is not None:
+        colors = colors.astype(np.int16)
+
+    stage_args = [(*args, *uniformArgs(shader, uniforms)) for shader in shaders]
+
+    # Read once, the flag can flip mid pass when the watcher thread shades
+    profiling = profile and profiler.active
+    bxs, bys = (xs, ys) if batch_grid is None else batch_grid
+
+    i = 0
+    while i < len(shaders):
+        if getattr(shaders[i], '_vectorized', False):
+            start = time.perf_counter() if profiling else None
+            result = shaders[i](colors, bxs, bys, frame, *stage_args[i])
+            if start is not None:
+                profiler.record((shaders[i],), xs.size, time.perf_counter() - start)
+
+            if result is None:
+                return None
+
+            colors = _colorArray(result, xs.shape)[..., :3]
+            i += 1
+            continue
+
+        # Group consecutive per-pixel shaders so they keep their chaining semantics
+        j = i
+        while j < len(shaders) and not getattr(shaders[j], '_vectorized', False):
+            j += 1
+
+        run = shaders[i:j]
+        start = time.perf_counter() if profiling else None
+        pixels = int(drawn.sum()) if profiling else 0
+
+        if pool is not None and all(getattr(shader, '_pure', False) for shader in run):
+            colors = pool.shade(run, colors, drawn, xs, ys, frame, stage_args[i:j])
+        else:
+            colors = _shadePixels(run, colors, drawn, xs, ys, frame, stage_args[i:j])
+
+        if start is not None:
+            profiler.record(tuple(run), pixels, time.perf_counter() - start)
+        i = j
+
+    if colors is None:
+        return np.zeros(xs.shape + (3,), np.uint8), drawn
+
+    return np.clip(colors, 0, 255).astype(np.uint8), drawn
+
+### Expression Shaders ###
+# Functions available in shader expressions, all work elementwise on arrays
+expressionFunctions = {
+    'sin': np.sin, 'cos': np.cos, 'tan': np.tan,
+    'asin': np.arcsin, 'acos': np.arccos, 'atan': np.arctan, 'atan2': np.arctan2,
+    'sqrt': np.sqrt, 'exp': np.exp, 'log': np.log, 'hypot': np.hypot,
+    'abs': np.abs, 'floor': np.floor, 'ceil': np.ceil, 'round': np.round,
+    'min': np.minimum, 'max': np.maximum,
+    'clamp': lambda value, low, high: np.clip(value, low, high),
+    'mix': lambda a, b, t: a + (b - a) * t,
+    'fract': lambda value: value - np.floor(value),
+    'where': np.where
+}
+
+expressionConstants = {'pi': math.pi, 'tau': math.tau, 'e': math.e}
+
+_expressionNodes = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call,
+    ast.Name, ast.Constant, ast.Load, ast.operator, ast.unaryop, ast.boolop, ast.cmpop
+)
+
+class _ExpressionCompiler(ast.NodeTransformer):
+    # Checks an expression against the whitelist and rewrites it into array code
+    def __init__(self, names):
+        self.names = names
+
+    def visit(self, node):
+        if not isinstance(node, _expressionNodes):
+            raise ValueError(f'{type(node).__name__} is not allowed in shader expressions')
+        return super().visit(node)
+
+    def visit_Name(self, node):
+        if node.id not in self.names:
+            raise ValueError(f'Unknown name in shader expression: {node.id}')
+        return node
+
+    def visit_Constant(self, node):
+        if not isinstance(node.value, (int, float)):
+            raise ValueError(f'Unsupported constant in shader expression: {node.value!r}')
+        return node
+
+    def visit_Call(self, node):
+        if not isinstance(node.func, ast.Name) or node.func.id not in expressionFunctions or node.keywords:
+            raise ValueError(f'Unsupported function call in shader expression: {ast.unparse(node.func)}')
+        node.args = [self.visit(arg) for arg in node.args]
+        return node
+
+    def _call(self, name, *args):
+        return ast.Call(ast.Name(name, ast.Load()), list(args), [])
+
+    def visit_IfExp(self, node):
+        # a if test else b -> where(test, a, b)
+        self.generic_visit(node)
+        return self._call('where', node.test, node.body, node.orelse)
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        function = '_and' if isinstance(node.op, ast.And) else '_or'
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = self._call(function, result, value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return self._call('_not', node.operand) if isinstance(node.op, ast.Not) else node
+
+    def visit_Compare(self, node):
+        # Chained comparisons become an elementwise and
+        self.generic_visit(node)
+        operands = [node.left, *node.comparators]
+        parts = [ast.Compare(a, [op], [b]) for a, op, b in zip(operands, node.ops, operands[1:])]
+        result = parts[0]
+        for part in parts[1:]:
+            result = self._call('_and', result, part)
+        return result
+
+def parseExpressions(text) -> list[tuple[str, str]]:
+    """Parses "name = expression" lines, blank lines and # comments are skipped"""
+    assignments = []
+    for number, line in enumerate(text.splitlines(), 1):
+        line = line.split('#', 1)[0].strip()
+        if not line:
+            continue
+
+        name, sep, expression = line.partition('=')
+        if not sep or not name.strip().isidentifier():
+            raise ValueError(f'Line {number}: expected "name = expression"')
+
+        assignments.append((name.strip(), expression.strip()))
+
+    return assignments
+
+def compileExpression(assignments, uniforms=None, name='<expression>') -> Callable:
+    """
+        Compiles an expression shader into a vectorized shader.
+
+        Expressions can use x, y, frame, the input color channels r, g, b,
+        declared uniforms, earlier assignments, the constants in expressionConstants
+        and the functions in expressionFunctions. Conditionals (a if c else b),
+        comparisons and and/or/not work elementwise.
+        Assigning r, g, b (and optionally a) sets the output color, channels that
+        aren't assigned keep the input color (0 in background passes).
+
+        Args:
+            assignments: (name, expression) pairs, evaluated in order.
+            uniforms: Uniform names and their defaults, passed after the shader args.
+            name: Name used in error messages and tracebacks.
+
+        Returns:
+            shader(colors, xs, ys, frame, *args, *uniforms) for whole arrays.
+    """
+    if uniforms is None:
+        uniforms = {}
+
+    # Names are pasted into generated source, so they have to be plain identifiers
+    reserved = {'x', 'y', 'frame', 'colors', 'extra', *expressionFunctions}
+
+    def valid(name):
+        return name.isidentifier() and not keyword.iskeyword(name) and not name.startswith('_') and name not in reserved
+
+    # Uniforms can't shadow the input channels or constants either
+    for uniform in uniforms:
+        if not valid(uniform) or uniform in {'r', 'g', 'b', 'a', *expressionConstants}:
+            raise ValueError(f'Invalid uniform name {uniform!r} in shader expression')
+
+    names = {'x', 'y', 'frame', 'r', 'g', 'b', *uniforms, *expressionConstants}
+    body = []
+
+    for target, expression in assignments:
+        if not valid(target):
+            raise ValueError(f'Can\'t assign to {target} in shader expression')
+
+        try:
+            tree = ast.parse(expression, mode='eval')
+        except SyntaxError as e:
+            raise ValueError(f'Invalid shader expression for {target}: {e.msg}') from None
+
+        tree = ast.fix_missing_locations(_ExpressionCompiler(names).visit(tree))
+        body.append(f'    {target} = {ast.unparse(tree.body)}')
+        names.add(target)
+
+    channels = 'r, g, b, a' if 'a' in names else 'r, g, b'
+    count = len(uniforms)
+    source = '\n'.join([
+        'def shader(colors, x, y, frame, *extra):',
+        '    r = g = b = 0',
+        '    if colors is not None:',
+        '        r, g, b = colors[..., 0], colors[..., 1], colors[..., 2]',
+        *([f'    {", ".join(uniforms)}, = extra[-{count}:] if len(extra) >= {count} else _defaults'] if count else []),
+        *body,
+        f'    return {channels}'
+    ])
+
+    namespace = {
+        **expressionFunctions, **expressionConstants,
+        '_and': np.logical_and, '_or': np.logical_or, '_not': np.logical_not,
+        '_defaults': tuple(uniforms.values())
+    }
+    return load_as_module(source, name, namespace).shader
+
+# Shaders loaded in a worker process by their pickled source
+_worker_shaders = {}
+
+def _workerShader(source):
+    key = pickle.dumps(source)
+    if key not in _worker_shaders:
+        shader_pack, shader_file, _, globals, modules, ignore_args, jit = source
+        globals = {**globals, **{k: importlib.import_module(name) for k, name in modules.items()}}
+
+        path = os.path.join(shader_pack, shader_file)
+        source, code = shaderRegistry.code(path)
+        shader_func = load_as_module(code, path, globals).shader
+
+        if jit:
+            shader_func = jitShader(shader_func, source, path, globals)
+
+        if ignore_args is not None:
+            shader_func = cache(ignore=ignore_args)(shader_func)
+
+        _worker_shaders[key] = shader_func
+
+    return _worker_shaders[key]
+
+def _shadeBand(task):
+    # Runs in a worker process
+    sources, colors, drawn, xs, ys, frame, args = task
+    shaders = [_workerShader(source) for source in sources]
+    colors = _shadePixels(shaders, colors, drawn, xs, ys, frame, args)
+    return colors, drawn
+
+class ShaderPool:
+    """
+        Persistent worker processes for pure per-pixel shaders.
+
+        The grid is split into bands of rows that are shaded in parallel.
+        Workers load each shader module once from its shader pack and keep it.
+        Shaders must be declared "pure" (no side effects) in shader.json.
+
+        Uses fork where available, with spawn the main script needs
+        an if __name__ == '__main__' guard.
+    """
+    __slots__ = ['workers', '_pool']
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._pool = None
+
+    def shade(self, shaders, colors, drawn, xs, ys, frame, args) -> np.ndarray:
+        if self._pool is None:
+            method = 'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn'
+            self._pool = multiprocessing.get_context(method).Pool(self.workers)
+
+        sources = tuple(shader._source for shader in shaders)
+        bands = [band for band in np.array_split(np.arange(xs.shape[1]), self.workers * 2) if band.size]
+
+        tasks = []
+        for band in bands:
+            rows = slice(band[0], band[-1] + 1)
+            tasks.append((
+                sources, None if colors is None else colors[:, rows],
+                drawn[:, rows], xs[:, rows], ys[:, rows], frame, args
+            ))
+
+        # map keeps the band order, so results are assembled deterministically
+        results = self._pool.map(_shadeBand, tasks)
+
+        drawn[:] = np.concatenate([band_drawn for _, band_drawn in results], axis=1)
+        return np.concatenate([band_colors for band_colors, _ in results], axis=1)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+class ShaderWatcher:
+    """
+        Reloads a game's shaders in the background when their files change.
+
+        Polls the mtimes of each loaded shader and its shader.json. Changed shaders
+        are recompiled on the watcher thread and swapped in between frames,
+        so a reload doesn't stall the game.
+
+        Args:
+            game: The game whose background and sprite shaders are watched.
+            interval: Seconds between polls.
+    """
+    __slots__ = ['game', 'interval', 'reloaded', '_stamps', '_thread', '_stop']
+
+    def __init__(self, game, interval=0.5):
+        self.game = game
+        self.interval = interval
+        self.reloaded = queue.Queue()  # (old, new) shaders waiting to be swapped in
+        self._stamps = {}
+        self._thread = None
+        self._stop = threading.Event()
+
+    def start(self):
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='ShaderWatcher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.poll()
+
+    def poll(self):
+        """Checks the shaders for changes and reloads the changed ones"""
+        swaps = {}
+        for shader in [*self.game.backgroundShaders, *self.game.spriteShaders]:
+            load = getattr(shader, '_load', None)
+            if load is None:
+                continue
+
+            shader_pack, shader_file, globals = load
+            try:
+                # Inline expression shaders only live in shader.json
+                paths = [os.path.join(shader_pack, 'shader.json'), os.path.join(shader_pack, shader_file)]
+                stamp = tuple(ShaderRegistry.stamp(path) for path in paths if os.path.exists(path))
+            except OSError:
+                continue  # Editors may replace the file while saving
+
+            if self._stamps.setdefault(shader, stamp) == stamp:
+                continue
+
+            # Broken files are retried once they change again
+            self._stamps[shader] = stamp
+
+            new = loadShaderFile(shader_pack, shader_file, globals)
+            if not callable(new):
+                print(f'{new[1]}\nCould not reload shader {shader_file}, keeping the old version')
+                continue
+
+            self._stamps[new] = stamp
+            swaps[shader] = new
+
+        if not swaps:
+            return
+
+        # Compile jit shaders and fused kernels here, the first frame after the swap would stall on it
+        chains = [[swaps.get(shader, shader) for shader in shaders] for shaders in (self.game.backgroundShaders, self.game.spriteShaders)]
+        try:
+            self.game.warmShaders(*chains)
+        except Exception as e:
+            print(f'Could not warm up reloaded shaders: {e}')
+
+        for old, new in swaps.items():
+            self.reloaded.put((old, new))
+
+    def apply(self):
+        """Swaps reloaded shaders into the game, call between frames"""
+        while not self.reloaded.empty():
+            old, new = self.reloaded.get_nowait()
+
+            for shaders in (self.game.backgroundShaders, self.game.spriteShaders):
+                for i, shader in enumerate(shaders):
+                    if shader is old:
+                        shaders[i] = new
+
+            # Results cached for the old version are stale
+            stale = {old, getattr(old, '_static_cache_key', None)} - {None}
+            staticShaderCache.discard(lambda key: key[0] in stale)
+            _shaded_rect_cache.discard(lambda key: key[0] in stale)
+
+            # So do fused runs of the old version, the watcher thread may be adding new ones
+            for key in list(_fusedRuns):
+                if old in key[0]:
+                    _fusedRuns.pop(key, None)
+
+            self._stamps.pop(old, None)
+            print(f'Reloaded shader {new._load[1]}')
+
+def _shadeSurface(surf, shader, res, mask, bounds, args):
+    # Array implementation of applyShader, shades surf in place
+    min_x, min_y, max_x, max_y = bounds
+    width, height = surf.get_size()
+
+    # Sample the top left pixel of every res x res block
+    blocks = slice(min_x, max_x, res), slice(min_y, max_y, res)
+    rgb = pygame.surfarray.pixels3d(surf)
+    alpha = pygame.surfarray.pixels_alpha(surf)
+    colors = rgb[blocks].astype(np.int16)
+    alphas = alpha[blocks].copy()
+
+    # Always skip completely transparent pixels
+    visible = alphas != 0
+
+    # Masked colors are made transparent instead of shaded
+    masked = visible & (colors == mask[:3]).all(-1) if mask else np.zeros(visible.shape, bool)
+    shade = visible & ~masked
+
+    new_rgb = colors.copy()
+    new_alpha = np.full(alphas.shape, 255, np.uint8)
+    written = shade.copy()
+    start = time.perf_counter() if profiler.active else None
+
+    if getattr(shader, '_vectorized', False):
+        xs, ys = coordGrid(width, height)
+        result = shader(colors, xs[blocks], ys[blocks], game.frame, *args)
+
+        if result is None:
+            written[:] = False
+        else:
+            result = _colorArray(result, colors.shape[:2])
+            new_rgb = result[..., :3]
+            if result.shape[-1] == 4:
+                new_alpha = result[..., 3].astype(np.uint8)
+
+    else:
+        # Per-pixel shaders, row by row like the surface
+        i, j = np.nonzero(shade.T)[::-1]
+        packed = (colors[i, j].astype(np.uint32) << [24, 16, 8]).sum(-1) | alphas[i, j]
+        Color = pygame.Color
+        frame = game.frame
+
+        results = [
+            shader(Color(color), x, y, frame, *args)
+            for x, y, color in zip((min_x + i * res).tolist(), (min_y + j * res).tolist(), packed.tolist())
+        ]
+
+        # Falsy results keep the original pixel
+        valid = np.fromiter(map(bool, results), bool, len(results))
+        if not valid.all():
+            written[i[~valid], j[~valid]] = False
+            i, j = i[valid], j[valid]
+            results = [result for result in results if result]
+
+        if i.size:
+            try:
+                results = np.array(results, np.int16)
+                assert results.ndim == 2
+            except (ValueError, AssertionError):
+                # Mixed rgb and rgba colors
+                results = np.array([(*result, 255)[:4] for result in results], np.int16)
+
+            new_rgb[i, j] = results[:, :3]
+            if results.shape[1] == 4:
+                new_alpha[i, j] = results[:, 3]
+
+    if start is not None:
+        profiler.record((shader,), int(shade.sum()), time.perf_counter() - start)
+
+    # Upscale the blocks once and write them back
+    x_end = min(width, min_x + written.shape[0] * res)
+    y_end = min(height, min_y + written.shape[1] * res)
+    region = slice(min_x, x_end), slice(min_y, y_end)
+
+    def upscale(array):
+        return np.repeat(np.repeat(array, res, 0), res, 1)[:x_end - min_x, :y_end - min_y]
+
+    block_mask = upscale(written)
+    np.copyto(rgb[region], upscale(new_rgb), where=block_mask[..., None], casting='unsafe')
+    np.copyto(alpha[region], upscale(new_alpha), where=block_mask)
+
+    # Only the sampled pixel of a masked block becomes transparent
+    rgb[blocks][masked] = 0
+    alpha[blocks][masked] = 0
+
+    # Release the surface locks
+    del rgb, alpha
 
 def applyShader(surf, shader, res=4, mask=None, view_rect=None, args=None) -> pygame.Surface:
     """
@@ -248,6 +1330,7 @@ def applyShader(surf, shader, res=4, mask=None, view_rect=None, args=None) -> py
         Args:
             surf: The surface to apply the shader to.
             shader: A function that takes a color and returns a modified color.
+                    Vectorized shaders get the sampled colors and coordinates as arrays.
             res: The resolution of the shader application (default is 4).
             mask: A color to not shade. (wont be visible)
             view_rect: Optional (x, y, width, height) to limit shader processing to visible area
@@ -258,11 +1341,14 @@ def applyShader(surf, shader, res=4, mask=None, view_rect=None, args=None) -> py
     # Check for static shader cache
     if hasattr(shader, '_static') and shader._static and shader._static_cache_key:
         cache_key = (shader._static_cache_key, surf.get_size(), res)
-        if cache_key in _static_shader_cache:
-            return _static_shader_cache[cache_key].copy()
+        cached = staticShaderCache.get(cache_key)
+        if cached is not None:
+            return cached
+
+    width, height = surf.get_size()
 
     # Create a new surface with alpha support
-    result_surf = pygame.Surface(surf.get_size(), pygame.SRCALPHA)
+    result_surf = pygame.Surface((width, height), pygame.SRCALPHA)
 
     # Copy initial surface
     result_surf.blit(surf, (0, 0))
@@ -272,50 +1358,51 @@ def applyShader(surf, shader, res=4, mask=None, view_rect=None, args=None) -> py
         # Only process the visible part of the surface
         min_x = max(0, view_rect[0])
         min_y = max(0, view_rect[1])
-        max_x = min(surf.get_width(), view_rect[0] + view_rect[2])
-        max_y = min(surf.get_height(), view_rect[1] + view_rect[3])
+        max_x = min(width, view_rect[0] + view_rect[2])
+        max_y = min(height, view_rect[1] + view_rect[3])
     else:
         # Process the entire surface if no view rect specified
         min_x, min_y = 0, 0
-        max_x, max_y = surf.get_width(), surf.get_height()
+        max_x, max_y = width, height
 
-    # Process only the pixels within bounds
-    for y in range(min_y, max_y, res):
-        for x in range(min_x, max_x, res):
-            try:
-                color = surf.get_at((x, y))
+    if min_x < max_x and min_y < max_y:
+        _shadeSurface(result_surf, shader, res, mask, (min_x, min_y, max_x, max_y), args)
 
-                # Always skip completely transparent pixels
-                if color.a == 0:
-                    continue
+    # Cache static shader result
+    if hasattr(shader, '_static') and shader._static and shader._static_cache_key:
+        cache_key = (shader._static_cache_key, surf.get_size(), res)
+        staticShaderCache.put(cache_key, result_surf.copy() if staticShaderCache.copy else result_surf)
 
-                # If using mask and this is a masked color, make it transparent
-                if mask and color.r == mask[0] and color.g == mask[1] and color.b == mask[2]:
-                    result_surf.set_at((x, y), (0, 0, 0, 0))
-                    continue
+    return result_surf
 
-                # Apply shader and update
-                new_color = shader(color, x, y, game.frame, *args)
+# Rounded rect masks by (width, height, border_radius)
+_mask_cache = SurfaceCache(16 * 1024 * 1024, copy=False)
 
-                if not new_color:
-                    continue
-                rect = (x, y, res, res)
-                pygame.gfxdraw.box(result_surf, rect, new_color)
+# Final drawRectShaded surfaces for static and frame independent shaders
+_shaded_rect_cache = SurfaceCache(copy=False)
 
-            except IndexError:
-                continue  # Handle edge case errors
+def roundedMask(width, height, border_radius) -> pygame.Surface:
+    """Returns a cached white rounded rect on a transparent surface, treat as read-only"""
+    key = width, height, border_radius
+    mask_surface = _mask_cache.get(key)
 
-    # Cache static shader result
-    if hasattr(shader, '_static') and shader._static and shader._static_cache_key:
-        cache_key = (shader._static_cache_key, surf.get_size(), res)
-        _static_shader_cache[cache_key] = result_surf.copy()
+    if mask_surface is None:
+        mask_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        mask_surface.fill((0, 0, 0, 0))  # Start transparent
 
-    return result_surf
+        # Draw the rounded rectangle onto the mask
+        pygame.draw.rect(mask_surface, (255, 255, 255, 255),
+                       (0, 0, width, height), 0, border_radius)
+
+        _mask_cache.put(key, mask_surface)
+
+    return mask_surface
 
 def drawRectShaded(rect, shader, res=4, border_radius=0, args=None) -> None:
     """
     Draw a shaded rectangle with optional rounded corners.
     Uses efficient pygame blending for proper masking and better performance.
+    Results of static and frame independent shaders are cached, so they cost one blit.
 
     Args:
         rect: The rectangle (x, y, width, height)
@@ -337,38 +1424,42 @@ def drawRectShaded(rect, shader, res=4, border_radius=0, args=None) -> None:
         rect[1] + height < 0 or rect[1] >= screen_height):
         return
 
-    # Create surface for the colored/shaded content
-    shader_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-    shader_surface.fill((100, 100, 100, 255))  # Fill with a neutral gray
-
     # Apply the shader - only to visible portion
-    visible_rect = [
+    visible_rect = (
         max(0, -rect[0]),
         max(0, -rect[1]),
         min(width, screen_width - rect[0]) - max(0, -rect[0]),
         min(height, screen_height - rect[1]) - max(0, -rect[1])
-    ]
+    )
+
+    # Static and frame independent shaders always give the same result
+    cache_key = None
+    if getattr(shader, '_static', False) or getattr(shader, '_frame_independent', False):
+        cache_key = (getattr(shader, '_static_cache_key', None) or shader, width, height, res, border_radius, visible_rect, make_hashable(list(args)))
+        try:
+            hash(cache_key)
+        except TypeError:
+            cache_key = None
 
-    shader_surface = applyShader(shader_surface, shader, res, view_rect=visible_rect, args=args)
+    result_surface = None if cache_key is None else _shaded_rect_cache.get(cache_key)
 
-    # Create the mask surface for the shape
-    mask_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-    mask_surface.fill((0, 0, 0, 0))  # Start transparent
+    if result_surface is None:
+        # Create surface for the colored/shaded content
+        shader_surface = pygame.Surface((width, height), pygame.SRCALPHA)
+        shader_surface.fill((100, 100, 100, 255))  # Fill with a neutral gray
 
-    # Draw the rounded rectangle onto the mask
-    pygame.draw.rect(mask_surface, (255, 255, 255, 255),
-                   (0, 0, width, height), 0, border_radius)
+        shader_surface = applyShader(shader_surface, shader, res, view_rect=visible_rect, args=args)
 
-    # Create the final surface
-    result_surface = pygame.Surface((width, height), pygame.SRCALPHA)
-    result_surface.fill((0, 0, 0, 0))  # Start transparent
+        # Use the rounded rect mask as an alpha channel
+        result_surface = shader_surface.copy()
+        result_surface.blit(roundedMask(width, height, border_radius), (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
 
-    # Blit the shader surface using the mask as an alpha channel
-    result_surface.blit(shader_surface, (0, 0))
-    result_surface.blit(mask_surface, (0, 0), special_flags=pygame.BLEND_RGBA_MULT)
+        if cache_key is not None:
+            _shaded_rect_cache.put(cache_key, result_surface)
 
     # Blit the final result to the game display
-    game.disp.blit(result_surface, (rect[0], rect[1]))
+    drawn = game.disp.blit(result_surface, (rect[0], rect[1]))
+    game.markDirty(drawn, None if cache_key is None else ('rect_shaded', result_surface))
 
 @cache()
 def textSize(text,size) -> tuple[int | Any, Any]:
@@ -386,6 +1477,30 @@ def textSize(text,size) -> tuple[int | Any, Any]:
 
     return largestX, size*i
 
+def textureArray(texture) -> np.ndarray:
+    """Converts a texture (list of columns of colors) to a (w, h, 3 or 4) array"""
+    try:
+        return np.array(texture, np.uint8)
+    except ValueError:
+        # Mixed rgb and rgba colors
+        return np.array([[(*col, 255)[:4] for col in column] for column in texture], np.uint8)
+
+def arraySurface(pixels, res=1) -> pygame.Surface:
+    """
+        Converts a (w, h, 3 or 4) color array to a surface scaled by res.
+
+        Arrays with an alpha channel get a per-pixel alpha surface.
+    """
+    surf = pygame.surfarray.make_surface(pixels[..., :3])
+
+    if pixels.shape[-1] == 4:
+        surf = surf.convert_alpha()
+        pygame.surfarray.pixels_alpha(surf)[:] = pixels[..., 3]
+    else:
+        surf = surf.convert()
+
+    return pygame.transform.scale(surf, (surf.get_width() * res, surf.get_height() * res))
+
 def floodfill(texture, pos, newColor, oldColor):
     rows = len(texture)
     cols = len(texture[0]) if rows > 0 else 0
@@ -501,7 +1616,7 @@ class Vec2:
         return Vec2(max(minValue, min(self.x, maxValue)), max(minValue, min(self.y, maxValue)))
 
     def draw(self,x,y):
-        pygame.draw.line(game.disp,(255,0,0),(x,y),(x+self.x,y+self.y),2)
+        drawLine((x,y),(x+self.x,y+self.y),(255,0,0),2)
 
 class Toast:
     __slots__ = ['pos', 'text', 'height', 'width', 'color', 'start_time', 'duration', 'id', 'targetId', 'animTarget']
@@ -536,8 +1651,229 @@ class Toast:
 
         return False
 
+class SpatialHash:
+    """
+        Uniform grid over sprite rects, used as a broadphase for collision queries.
+
+        Moved or resized sprites are only marked dirty and get rehashed on the
+        next query. While most of the sprites move every frame rehashing costs
+        more than it saves, so queries return None until the sprites have been
+        still for a couple of frames (see endFrame).
+    """
+    __slots__ = ['rect', 'size', 'cells', 'sprites', 'dirty', 'moved', 'calm']
+
+    def __init__(self, rect, size=16):
+        self.rect = rect    # sprite -> (x, y, width, height)
+        self.size = size    # Cell size in cells
+        self.cells = {}     # (cx, cy) -> set of sprites
+        self.sprites = {}   # sprite -> covered cell range (x0, y0, x1, y1)
+        self.dirty = set()
+        self.moved = 0      # Touches this frame
+        self.calm = 0       # Frames in a row with most sprites still
+
+    def _range(self, rect):
+        x, y, width, height = rect
+        size = self.size
+        return int(x // size), int(y // size), int((x + max(width, 0)) // size), int((y + max(height, 0)) // size)
+
+    def add(self, sprite):
+        self.sprites.setdefault(sprite, None)
+        self.touch(sprite)
+
+    def remove(self, sprite):
+        self.dirty.discard(sprite)
+        cells = self.sprites.pop(sprite, None)
+        if cells:
+            self._unlink(sprite, cells)
+
+    def touch(self, sprite):
+        """Marks a sprite to be rehashed, call after it moves or resizes"""
+        self.dirty.add(sprite)
+        self.moved += 1
+
+    def _unlink(self, sprite, cells):
+        x0, y0, x1, y1 = cells
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells[cx, cy]
+                cell.discard(sprite)
+                if not cell:
+                    del self.cells[cx, cy]
+
+    def flush(self):
+        """Rehashes the sprites that moved or resized since the last flush"""
+        for sprite in self.dirty:
+            if sprite not in self.sprites:
+                continue
+
+            old = self.sprites[sprite]
+            new = self._range(self.rect(sprite))
+            if new == old:
+                continue
+
+            if old:
+                self._unlink(sprite, old)
+
+            x0, y0, x1, y1 = new
+            for cy in range(y0, y1 + 1):
+                for cx in range(x0, x1 + 1):
+                    self.cells.setdefault((cx, cy), set()).add(sprite)
+
+            self.sprites[sprite] = new
+
+        self.dirty.clear()
+
+    def endFrame(self):
+        """Counts calm frames, called once per frame by Game._draw"""
+        self.calm = 0 if self.moved * 2 > len(self.sprites) else self.calm + 1
+        self.moved = 0
+
+    def ready(self) -> bool:
+        """Flushes pending moves, returns False instead while most sprites are moving"""
+        busy = self.calm < 2 or self.moved * 2 > len(self.sprites)
+        if busy and len(self.dirty) * 2 > len(self.sprites):
+            return False
+
+        self.flush()
+        return True
+
+    def query(self, rect):
+        """
+            Returns the sprites whose cells overlap a rect.
+
+            This is a superset of the sprites actually touching it, callers
+            still run their exact test on the result. Returns None while most
+            sprites are moving, callers should test every sprite instead.
+
+            Args:
+                rect: (x, y, width, height)
+        """
+        if not self.ready():
+            return None
+
+        x0, y0, x1, y1 = self._range(rect)
+
+        found = set()
+        if (x1 - x0 + 1) * (y1 - y0 + 1) > len(self.cells):
+            for key, cell in self.cells.items():
+                if x0 <= key[0] <= x1 and y0 <= key[1] <= y1:
+                    found |= cell
+            return found
+
+        for cy in range(y0, y1 + 1):
+            for cx in range(x0, x1 + 1):
+                cell = self.cells.get((cx, cy))
+                if cell:
+                    found |= cell
+
+        return found
+
+def _spriteRect(sprite):
+    return sprite.x, sprite.y, sprite.width, sprite.height
+
+def _posRect(sprite):
+    return round(sprite.pos[0]), round(sprite.pos[1]), sprite.width, sprite.height
+
+def _rayStep(angle):
+    # Rays move in half cell steps along the nearest of the 8 directions
+    angle = math.radians(angle)
+    return round(math.cos(angle))/2, round(math.sin(angle))/2
+
+def _raySpan(start, step, lo, hi):
+    # Steps j at which start + j*step lies in [lo, hi)
+    if step == 0:
+        return (-math.inf, math.inf) if lo <= start < hi else (math.inf, -math.inf)
+
+    if step > 0:
+        first = math.ceil((lo - start) / step)
+        last = math.ceil((hi - start) / step) - 1
+    else:
+        first = math.floor((hi - start) / step) + 1
+        last = math.floor((lo - start) / step)
+
+    # The division can round across a boundary, settle on the samples themselves
+    if not lo <= start + first*step < hi:
+        first += 1
+    elif lo <= start + (first - 1)*step < hi:
+        first -= 1
+
+    if not lo <= start + last*step < hi:
+        last -= 1
+    elif lo <= start + (last + 1)*step < hi:
+        last += 1
+
+    return first, last
+
+def _rayHit(x, y, dx, dy, sprite, distance):
+    # First step (1 based) at which the ray is inside the sprite, or None
+    first_x, last_x = _raySpan(x, dx, sprite.x, sprite.x + sprite.width)
+    first_y, last_y = _raySpan(y, dy, sprite.y, sprite.y + sprite.height)
+    first = max(first_x, first_y, 1)
+    return first if first <= min(last_x, last_y, distance) else None
+
+def _sweepAxis(start, size, move, other, other_size):
+    # Times at which the moving span starts and stops overlapping the other one
+    if move > 0:
+        return (other - (start + size)) / move, (other + other_size - start) / move
+    if move < 0:
+        return (other + other_size - start) / move, (other - (start + size)) / move
+    return (-math.inf, math.inf) if start < other + other_size and start + size > other else (math.inf, -math.inf)
+
+def _depth(rect, other, normal):
+    # How far rect has to move along normal to stop overlapping other
+    x, y, width, height = rect
+    ox, oy, owidth, oheight = other
+    match normal:
+        case (-1, 0): return x + width - ox
+        case (1, 0): return ox + owidth - x
+        case (0, -1): return y + height - oy
+        case _: return oy + oheight - y
+
+def sweepRect(rect, delta, other):
+    """
+        Sweeps a moving rect against a static one.
+
+        Rects overlap when their insides do, touching edges do not count.
+        A rect that already overlaps and is not moving out gets t = 0 and the
+        normal of the shallowest way out.
+
+        Args:
+            rect: (x, y, width, height) at the start of the move
+            delta: (dx, dy) movement
+            other: (x, y, width, height)
+
+        Returns (t, normal) with t in [0, 1) the fraction of delta before
+        contact and normal the side of other that was hit, or None
+    """
+    x, y, width, height = rect
+    dx, dy = delta
+    enter_x, leave_x = _sweepAxis(x, width, dx, other[0], other[2])
+    enter_y, leave_y = _sweepAxis(y, height, dy, other[1], other[3])
+    enter = max(enter_x, enter_y)
+    leave = min(leave_x, leave_y)
+
+    if enter >= leave or enter >= 1 or leave <= 0:
+        return None
+
+    if enter >= 0:
+        # The axis that started overlapping last is the one that was hit, floors win ties
+        if enter_y >= enter_x:
+            return enter, (0, -1 if dy > 0 else 1)
+        return enter, (-1 if dx > 0 else 1, 0)
+
+    # Already overlapping
+    normal = min(((-1, 0), (1, 0), (0, -1), (0, 1)), key=lambda normal: _depth(rect, other, normal))
+    if normal[0] * dx + normal[1] * dy > 0:
+        return None
+    return 0, normal
+
 class Sprite:
-    def __init__(self, pos, texture, draw=None):
+    # Spatial indexes of the game the sprite was added to, see Game.rects and Game.points
+    _rects = None
+    _points = None
+    _pos = _x = _y = _width = _height = None
+
+    def __init__(self, pos, texture, draw=None, static=False):
         self.pos = pos
         self.x = pos[0]
         self.y = pos[1]
@@ -549,25 +1885,140 @@ class Sprite:
             self.height = 0
         self.texture = texture
         self.draw = draw
+        self.static = static
+        self._pixels = None
+        self._surface = None
+
+    # Position and size are tracked so the game's spatial indexes stay current
+
+    @property
+    def pos(self):
+        return self._pos
+
+    @pos.setter
+    def pos(self, value):
+        self._pos = value
+        if self._points is not None:
+            self._points.touch(self)
+
+    @property
+    def x(self):
+        return self._x
+
+    @x.setter
+    def x(self, value):
+        if value == self._x:
+            return
+
+        self._x = value
+        if self._rects is not None:
+            self._rects.touch(self)
+
+    @property
+    def y(self):
+        return self._y
+
+    @y.setter
+    def y(self, value):
+        if value == self._y:
+            return
+
+        self._y = value
+        if self._rects is not None:
+            self._rects.touch(self)
+
+    @property
+    def width(self):
+        return self._width
+
+    @width.setter
+    def width(self, value):
+        if value == self._width:
+            return
+
+        self._width = value
+        if self._rects is not None:
+            self._rects.touch(self)
+            self._points.touch(self)
+
+    @property
+    def height(self):
+        return self._height
+
+    @height.setter
+    def height(self, value):
+        if value == self._height:
+            return
+
+        self._height = value
+        if self._rects is not None:
+            self._rects.touch(self)
+            self._points.touch(self)
+
+    @property
+    def pixels(self) -> np.ndarray:
+        """The texture as a (width, height, 3 or 4) array, rebuilt only after invalidate()"""
+        if self._pixels is None:
+            self._pixels = textureArray(self.texture)
+        return self._pixels
+
+    @property
+    def surface(self) -> pygame.Surface:
+        """The texture pre-scaled to the game resolution, rebuilt only after invalidate()"""
+        if self._surface is None:
+            self._surface = arraySurface(self.pixels, self.game.res)
+        return self._surface
+
+    def invalidate(self):
+        """Marks the cached texture as stale, call after editing the texture in place"""
+        self._pixels = None
+        self._surface = None
+        self._rebake()
+
+    def _rebake(self):
+        if self.static and hasattr(self, 'game'):
+            self.game.staticLayer.update(self)
 
     def setPos(self,x,y):
         self.pos = x,y
+        self.x = x
+        self.y = y
+        self._rebake()
 
     def move(self, pos):
         self.x += pos[0]
         self.y += pos[1]
         self.pos = self.x, self.y
+        self._rebake()
 
     def collides_with(self, sprites):
         if isinstance(sprites, list):
-            return [sprite for sprite in sprites if self.collides_with(sprite)]
+            index = self._rects
+            if index is None or len(sprites) < 16:
+                return [sprite for sprite in sprites if self.collides_with(sprite)]
+
+            # Only sprites sharing a cell can collide, ones outside the index are tested directly
+            near = index.query((self.x - 1, self.y - 1, self.width + 2, self.height + 2))
+            if near is None:
+                return [sprite for sprite in sprites if self.collides_with(sprite)]
+
+            hits = {sprite for sprite in near if self.collides_with(sprite)}
+            indexed = index.sprites
+
+            return [
+                sprite for sprite in sprites
+                if sprite in hits or (sprite not in indexed and self.collides_with(sprite))
+            ]
 
         if sprites == "edge":
+            # Edges of the screen, through the camera
+            x = self.x + self.game.camera[0]
+            y = self.y + self.game.camera[1]
             return (
-                self.x < 0
-                or self.y < 0
-                or self.x + self.width > self.game.width
-                or self.y-1 + self.height > self.game.height
+                x < 0
+                or y < 0
+                or x + self.width > self.game.width
+                or y-1 + self.height > self.game.height
             )
 
         return sprites if (
@@ -577,6 +2028,92 @@ class Sprite:
             and self.y+1 < sprites.y + sprites.height
         ) else None
 
+    def _near(self, rect, sprites):
+        # The sprites that may overlap rect, in list order
+        index = self._rects
+        near = index.query(rect) if index is not None and len(sprites) >= 16 else None
+        if near is None:
+            return sprites
+
+        indexed = index.sprites
+        return [sprite for sprite in sprites if sprite in near or sprite not in indexed]
+
+    def sweep(self, delta, sprites, offset=(0, 0)):
+        """
+            Finds the first sprite hit when moving by delta, see sweepRect.
+
+            Uses the same box as collides_with, so a sweep that stops at
+            contact leaves collides_with false.
+
+            Args:
+                delta: (dx, dy) movement
+                sprites: list of sprites to test against
+                offset: where to start, relative to the sprite
+
+            Returns (t, normal, sprite) or None
+        """
+        box = (self.x + offset[0] + 1, self.y + offset[1] + 1, self.width - 2, self.height - 2)
+        swept = (
+            box[0] + min(delta[0], 0), box[1] + min(delta[1], 0),
+            box[2] + abs(delta[0]), box[3] + abs(delta[1])
+        )
+
+        best = None
+        for sprite in self._near(swept, sprites):
+            if sprite is self:
+                continue
+
+            hit = sweepRect(box, delta, (sprite.x, sprite.y, sprite.width, sprite.height))
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = *hit, sprite
+
+        return best
+
+    def resolve(self, delta, sprites, iterations=4):
+        """
+            Moves along delta as far as the sprites allow, sliding along what it hits.
+
+            Nothing is moved, the caller applies the result, so it works
+            for sprites moved through the camera too.
+
+            Args:
+                delta: (dx, dy) movement
+                sprites: list of solid sprites
+                iterations: contacts to slide along before giving up on the rest of the move
+
+            Returns ((dx, dy), contacts) with the allowed movement and a
+            (normal, sprite) for every contact in the order they were hit
+        """
+        dx, dy = delta
+        moved_x = moved_y = 0
+        contacts = []
+
+        for _ in range(iterations):
+            hit = self.sweep((dx, dy), sprites, (moved_x, moved_y))
+            if hit is None:
+                return (moved_x + dx, moved_y + dy), contacts
+
+            t, normal, sprite = hit
+            contacts.append((normal, sprite))
+            moved_x += dx * t
+            moved_y += dy * t
+
+            # Push out of anything it started inside of
+            box = (self.x + moved_x + 1, self.y + moved_y + 1, self.width - 2, self.height - 2)
+            depth = _depth(box, (sprite.x, sprite.y, sprite.width, sprite.height), normal)
+            if depth > 0:
+                moved_x += normal[0] * depth
+                moved_y += normal[1] * depth
+
+            # Slide: the rest of the move without the blocked axis
+            dx, dy = dx * (1 - t), dy * (1 - t)
+            if normal[0]:
+                dx = 0
+            else:
+                dy = 0
+
+        return (moved_x, moved_y), contacts
+
     def collidepoint(self, point):
         pos = round(self.pos[0]), round(self.pos[1])
 
@@ -589,33 +2126,135 @@ class Sprite:
         """
         Raycast from the sprite in the given direction
 
-        Returns the distance to the first collision, or None if no collision is found
+        Returns (steps, sprite) for the first collision, or None if no collision is found
         """
-        angle = math.radians(angle)
-        dx = round(math.cos(angle))/2
-        dy = round(math.sin(angle))/2
-        x = self.x+self.width/2
-        y = self.y+self.height/2
-
-        for steps in range(distance):
-            x += dx
-            y += dy
-            for sprite in self.game.sprites:
-                if sprite != self and sprite.x <= x < sprite.x + sprite.width and sprite.y <= y < sprite.y + sprite.height:
-                    return steps, sprite
-
-        return None
+        return self.game.raycast((self.x + self.width/2, self.y + self.height/2), angle, distance, ignore=self)
 
     def updateTexture(self, texture):
         self.width = len(texture)
         self.height = len(texture[0])
         self.texture = texture
+        self.invalidate()
+
+    def paint(self, pos, color):
+        self.texture[pos[0]][pos[1]] = color
+        self.invalidate()
+
+    def floodfill(self, pos, color):
+        floodfill(self.texture, pos, color, self.texture[pos[0]][pos[1]])
+        self.invalidate()
 
     def add(self, game):
         self.game = game
         game.sprites.append(self)
+
+        self._rects = game.rects
+        self._points = game.points
+        game.rects.add(self)
+        game.points.add(self)
+
+        if self.static and not self.draw:
+            game.staticLayer.add(self)
+
         return self
 
+    def remove(self):
+        self.game.sprites.remove(self)
+        self.game.staticLayer.remove(self)
+
+        self.game.rects.remove(self)
+        self.game.points.remove(self)
+        self._rects = None
+        self._points = None
+
+class StaticLayer:
+    """
+        Static sprites baked into chunked world space surfaces.
+
+        Sprites are baked at their world position (sprite.pos) and the visible
+        chunks are blitted at the drawn camera offset (game.view). A chunk is only rebaked
+        when a sprite in it moves, is resized or changes its texture.
+    """
+    __slots__ = ['game', 'size', 'chunks', 'sprites', 'dirty', '_order']
+
+    def __init__(self, game, size=64):
+        self.game = game
+        self.size = size    # Chunk size in cells
+        self.chunks = {}    # (cx, cy) -> baked surface
+        self.sprites = {}   # sprite -> (order, world rect)
+        self.dirty = set()
+        self._order = 0
+
+    def _keys(self, rect):
+        x, y, width, height = rect
+        for cy in range(int(y // self.size), int((y + height - 1) // self.size) + 1):
+            for cx in range(int(x // self.size), int((x + width - 1) // self.size) + 1):
+                yield cx, cy
+
+    def add(self, sprite):
+        # Keep the original draw order when a sprite gets rebaked
+        order = self.sprites[sprite][0] if sprite in self.sprites else self._order
+        self._order += 1
+
+        rect = (sprite.pos[0], sprite.pos[1], max(sprite.width, 1), max(sprite.height, 1))
+        self.sprites[sprite] = order, rect
+        self.dirty.update(self._keys(rect))
+
+    def remove(self, sprite):
+        if sprite in self.sprites:
+            _, rect = self.sprites.pop(sprite)
+            self.dirty.update(self._keys(rect))
+
+    def update(self, sprite):
+        if sprite in self.sprites:
+            # Rebake both where the sprite was and where it is now
+            self.dirty.update(self._keys(self.sprites[sprite][1]))
+            self.add(sprite)
+
+    def _bake(self, key):
+        res = self.game.res
+        origin = key[0] * self.size, key[1] * self.size
+
+        sprites = sorted(
+            ((order, sprite) for sprite, (order, rect) in self.sprites.items()
+            if rect[0] < origin[0] + self.size and rect[0] + rect[2] > origin[0]
+            and rect[1] < origin[1] + self.size and rect[1] + rect[3] > origin[1]),
+            key=lambda item: item[0]
+        )
+
+        if not sprites:
+            self.chunks.pop(key, None)
+            return
+
+        surf = pygame.Surface((self.size * res, self.size * res), pygame.SRCALPHA)
+        for _, sprite in sprites:
+            if getattr(sprite, 'hidden', False):
+                continue
+            surf.blit(sprite.surface, ((sprite.pos[0] - origin[0]) * res, (sprite.pos[1] - origin[1]) * res))
+
+        self.chunks[key] = surf
+
+    def draw(self):
+        game = self.game
+
+        for key in self.dirty:
+            self._bake(key)
+        self.dirty.clear()
+
+        # Visible part of the world
+        view = (-game.view[0], -game.view[1], game.width, game.height)
+
+        for key in self._keys(view):
+            surf = self.chunks.get(key)
+            if surf is None:
+                continue
+
+            pos = (
+                (key[0] * self.size + game.view[0]) * game.res,
+                (key[1] * self.size + game.view[1]) * game.res
+            )
+            game.markDirty(game.disp.blit(surf, pos), ('chunk', surf))
+
 eventMap = {
     "keyDown": pygame.KEYDOWN,
     "keyUp": pygame.KEYUP,
@@ -625,15 +2264,31 @@ eventMap = {
     "scroll": pygame.MOUSEWHEEL
 }
 
+# Coarsest background shader step (1/8 resolution)
+maxShaderScale = 8
+
+# Share of Game.frame_budget the background shaders may take before the governor coarsens them
+backgroundShare = 0.5
+
 class Game:
     __slots__ = ['id', 'version', 'title', 'size', 'width', 'height', 'res', 'max_fps',
-                 'bg', 'sprites', 'toasts', 'spriteShaders', 'backgroundShaders', 'events',
-                 'disp', 'clock', 'running', 'frame', 'dt']
+                 'bg', 'background', 'sprites', 'toasts', 'spriteShaders', 'backgroundShaders', 'events',
+                 'disp', 'clock', 'running', 'frame', 'dt', 'camera', 'staticLayer', 'rects', 'points',
+                 'dirty_rects', '_drawn', '_prevDrawn', '_fullRepaint', '_shownBackground', 'shaderPool',
+                 'frame_budget', 'shaderScale', '_bgTime', '_bgPixels', '_bgCamera', '_bgKey', '_bgFrame', 'uniforms', 'shaderWatcher', 'statsOverlay',
+                 'tick_rate', 'max_ticks', 'interpolate', 'tick', 'alpha', 'view', '_accumulator', '_tickClock', '_prevPositions', '_prevCamera']
 
-    def __init__(self, title, size, res=16, max_fps=0, bg=(0,0,0), flags=0):
+    def __init__(self, title, size, res=16, max_fps=0, bg=(0,0,0), flags=0, dirty_rects=False, font=None, preload_fonts=(), workers=0, frame_budget=None, watch_shaders=False, tick_rate=None, max_ticks=5, interpolate=True):
         global game
         game = self
 
+        # Fonts are set up before the first frame to avoid hitches
+        # preload_fonts: sizes for preloadFonts
+        if font:
+            registerFont(font)
+
+        preloadFonts(preload_fonts)
+
         self.title = title
         self.size = size
         self.width = size[0]//res
@@ -641,12 +2296,60 @@ class Game:
         self.res = res
         self.max_fps = max_fps
         self.bg = bg
+        self.background = None
         self.frame = 0
 
+        # Dirty rect rendering: only regions that changed since last frame get updated
+        self.dirty_rects = dirty_rects
+        self._drawn = []
+        self._prevDrawn = []
+        self._fullRepaint = True
+        self._shownBackground = None
+
         self.sprites = []
         self.toasts  = []
+        self.camera  = [0, 0]  # Offset from world to screen cells, applied when drawing
+        self.staticLayer = StaticLayer(self)
+        self.rects   = SpatialHash(_spriteRect)  # Sprites by x, y for collides_with, sweeps and rays
+        self.points  = SpatialHash(_posRect)   # Sprites by pos for collidepoint
         self.spriteShaders = []
         self.backgroundShaders = []
+
+        # Worker processes for pure background shaders (0 = render on this process)
+        self.shaderPool = ShaderPool(workers) if workers else None
+
+        # Background shaders render at 1/shaderScale resolution when they take more than
+        # backgroundShare of frame_budget (seconds per frame, None = always full resolution)
+        self.frame_budget = frame_budget
+        self.shaderScale = 1
+        self._bgTime = 0    # Time spent and pixels shaded by background shaders last frame
+        self._bgPixels = 0
+        self._bgCamera = None
+        self._bgKey = None
+        self._bgFrame = None
+
+        # Values for shader uniforms by name, shaders fall back to their declared defaults
+        self.uniforms = {}
+
+        # Reloads shaders when their files change
+        self.shaderWatcher = ShaderWatcher(self) if watch_shaders else None
+
+        # Draws profiler.report() on screen, see profileShaders
+        self.statsOverlay = False
+
+        # Fixed timestep: 'tick' callbacks run tick_rate times a second whatever the frame rate,
+        # at most max_ticks per frame when catching up. Frames in between draw sprites and the
+        # camera interpolated between the last two ticks by alpha
+        self.tick_rate = tick_rate
+        self.max_ticks = max_ticks
+        self.interpolate = interpolate
+        self.tick = 0
+        self.alpha = 1
+        self.view = (0, 0)  # Camera offset drawn this frame
+        self._accumulator = 0
+        self._tickClock = None
+        self._prevPositions = {}
+        self._prevCamera = None
         self.events  = {}
 
         self.disp = pygame.display.set_mode((self.width*res,self.height*res),vsync=True,flags=flags)
@@ -654,48 +2357,91 @@ class Game:
 
         self.dt = 0.001
 
-    def _draw(self):  # sourcery skip: low-code-quality
-        # Background shader pass
-        if self.backgroundShaders:
-            shader_surface = pygame.Surface((self.width, self.height))
+    def _runTicks(self):
+        step = 1 / self.tick_rate
+        now = time.perf_counter()
+        self._accumulator += now - (self._tickClock or now)
+        self._tickClock = now
 
-            col = None
+        ticks = int(self._accumulator / step)
+        if ticks > self.max_ticks:
+            # Too far behind to catch up, drop the rest and run slower instead
+            ticks = self.max_ticks
+            self._accumulator = ticks * step
 
-            # Shader pass
-            for y in range(self.height):
-                for x in range(self.width):
-                    for shader in self.backgroundShaders:
-                        col = shader(col, x, y, self.frame)
-                        if col is None:
-                            break
+        for i in range(ticks):
+            # Frames until the next tick draw between the state before and after the last one
+            if i == ticks - 1 and self.interpolate:
+                self._prevPositions = {sprite: (sprite.x, sprite.y) for sprite in self.sprites}
+                self._prevCamera = tuple(self.camera)
 
-                    if col is not None:
-                        shader_surface.set_at((x, y), col)
+            for callback in self.events.get('tick', []):
+                callback(self.tick)
+            self.tick += 1
 
-            self.width  = self.disp.get_width()  // self.res
-            self.height = self.disp.get_height() // self.res
+        self._accumulator -= ticks * step
+        self.alpha = self._accumulator / step if self.interpolate else 1
 
-            # Scale shader surface to screen
-            pygame.transform.scale(shader_surface, (self.width * self.res, self.height * self.res), self.disp)
+    def _interpolate(self, prev, current):
+        # Position drawn this frame for something at prev before the last tick and current after it
+        if prev is None or self.alpha >= 1:
+            return tuple(current)
+
+        alpha = self.alpha
+        return prev[0] + (current[0] - prev[0]) * alpha, prev[1] + (current[1] - prev[1]) * alpha
+
+    def _draw(self):  # sourcery skip: low-code-quality
+        view = self._interpolate(self._prevCamera, self.camera)
+        if view != self.view:
+            # Scrolling moves everything on screen
+            self.view = view
+            self.invalidate()
+
+        # Background shader pass
+        if self.backgroundShaders:
+            self._drawBackground()
+
+        elif self.background is not self._shownBackground:
+            self._shownBackground = self.background
+            self.invalidate()
+            self._clear()
+
+        elif self.dirty_rects and not self._fullRepaint:
+            # Erase everything drawn last frame, it gets drawn again this frame
+            for _, rect in self._prevDrawn:
+                self._clear(rect)
 
         else:
             # Clear background
-            self.disp.fill(self.bg)
+            self._clear()
 
         # Sprite rendering with culling
         screen_rect = pygame.Rect(0, 0, self.width, self.height)
 
+        # Baked static sprites, drawn live while sprite shaders are active
+        baked = not self.spriteShaders
+        if baked:
+            self.staticLayer.draw()
+
         for sprite in self.sprites:
             if hasattr(sprite,'hidden') and sprite.hidden:
                 continue
 
+            if baked and sprite.static and sprite in self.staticLayer.sprites:
+                continue
+
             # Custom draw method takes precedence
             if sprite.draw:
                 sprite.draw()
                 continue
 
+            # Sprites live in world space, the camera is applied here
+            x, y = self._interpolate(self._prevPositions.get(sprite), (sprite.x, sprite.y))
+            x += self.view[0]
+            y += self.view[1]
+
             # Sprite culling
-            sprite_rect = pygame.Rect(sprite.x, sprite.y, sprite.width, sprite.height)
+            sprite_rect = pygame.Rect(x, y, sprite.width, sprite.height)
             if not screen_rect.colliderect(sprite_rect):
                 continue
 
@@ -703,27 +2449,13 @@ class Game:
             if not screen_rect.colliderect(sprite_rect):
                 continue
 
-            # Optimized sprite rendering
-            for y in range(min(sprite.height, self.height - int(sprite.y))):
-                for x in range(min(sprite.width, self.width - int(sprite.x))):
-                    try:
-                        col = sprite.texture[x][y]
-                    except IndexError:
-                        break
-
-                    skip = False
-                    # Apply shaders
-                    for shader in self.spriteShaders:
-                        col = shader(col, int(sprite.x + x), int(sprite.y + y), self.frame, sprite)
-                        if not col:
-                            skip = True
-                            break
-
-                    if skip:
-                        break
+            # Cached texture, one blit per sprite
+            if not self.spriteShaders:
+                surf = sprite.surface
+                self.markDirty(self.disp.blit(surf, (x * self.res, y * self.res)), ('sprite', surf))
+                continue
 
-                    # Draw pixel
-                    pygame.gfxdraw.box(self.disp, ((sprite.x + x) * self.res, (sprite.y + y) * self.res, self.res, self.res), col)
+            self._drawShaded(sprite, x, y)
 
         # Toast rendering
         removed = 0
@@ -740,18 +2472,438 @@ class Game:
             if toast.animTarget >= 0:
                 toast.animTarget -= min(toast.animTarget, 20)
 
-    def shader(self,background = False):
+        if self.statsOverlay:
+            self._drawStats()
+
+        self.rects.endFrame()
+        self.points.endFrame()
+
+    def _drawStats(self):
+        rows = [('Shader', 'ms/frame', 'us/px', 'cache')]
+        for row in self.shaderStats()[:8]:
+            hit_rate = '-' if row['cache_hit_rate'] is None else f'{row["cache_hit_rate"]:.0%}'
+            rows.append((row['name'][:28], f'{row["frame_time"] * 1000:.2f}', f'{row["pixel_time"] * 1e6:.2f}', hit_rate))
+
+        # One text block per column, the default font isn't monospaced
+        x = self.width * self.res - 420
+        for column, offset in zip(zip(*rows), (0, 230, 310, 370)):
+            drawText('\n'.join(column), x + offset, 5, 14)
+
+    def profileShaders(self, enabled=True, sample=10, overlay=False):
+        """
+        Turns shader profiling on or off.
+
+        Args:
+            enabled: Whether to collect timings.
+            sample: Measure one frame out of this many.
+            overlay: Draw the statistics in the top right corner.
+        """
+        profiler.enabled = enabled
+        profiler.sample = sample
+        self.statsOverlay = enabled and overlay
+
+    def shaderStats(self) -> list[dict]:
+        """Returns per-shader timings and cache hit rates, see ShaderProfiler.report"""
+        return profiler.report()
+
+    def worldToScreen(self, pos) -> tuple:
+        """Returns the screen pixel a world position is drawn at this frame, for custom sprite draws"""
+        return (pos[0] + self.view[0]) * self.res, (pos[1] + self.view[1]) * self.res
+
+    def screenToWorld(self, pos) -> tuple:
+        """Returns the world cell under a screen pixel, eg. the mouse position"""
+        return pos[0] // self.res - self.view[0], pos[1] // self.res - self.view[1]
+
+    def spritesAt(self, point, sprites=None) -> list:
+        """
+            Returns the sprites whose collidepoint matches a world point, in list order.
+
+            Args:
+                point: (x, y) in world cells
+                sprites: list to search, defaults to every sprite in the game
+        """
+        if sprites is None:
+            sprites = self.sprites
+
+        near = self.points.query((point[0], point[1], 0, 0))
+        if near is None:
+            return [sprite for sprite in sprites if sprite.collidepoint(point)]
+
+        indexed = self.points.sprites
+
+        return [
+            sprite for sprite in sprites
+            if (sprite in near or sprite not in indexed) and sprite.collidepoint(point)
+        ]
+
+    def raycast(self, origin, angle, distance=500, ignore=None):
+        """
+            Casts a ray in half cell steps from a world point.
+
+            Walks the rect index cell by cell and only tests the sprites
+            in cells the ray crosses.
+
+            Args:
+                origin: (x, y) in world cells
+                angle: direction in degrees, snapped to the nearest of 8 directions
+                distance: maximum number of steps
+                ignore: sprite the ray cannot hit, usually the caster
+
+            Returns (steps, sprite) for the first sprite hit, or None
+        """
+        if self.rects.ready():
+            return self._castCells(origin, _rayStep(angle), distance, ignore)
+
+        return self.raycasts([(origin, angle)], distance, ignore)[0]
+
+    def _castCells(self, origin, direction, distance, ignore):
+        x, y = origin
+        dx, dy = direction
+        index = self.rects
+        size = index.size
+
+        best = None
+        step = 1
+        while step <= distance:
+            # Cell holding this step and the last step before the ray leaves it
+            cx = int((x + step*dx) // size)
+            cy = int((y + step*dy) // size)
+            end = min(
+                _raySpan(x, dx, cx * size, (cx + 1) * size)[1],
+                _raySpan(y, dy, cy * size, (cy + 1) * size)[1],
+                distance
+            )
+
+            for sprite in index.cells.get((cx, cy), ()):
+                if sprite is ignore:
+                    continue
+                hit = _rayHit(x, y, dx, dy, sprite, distance)
+                if hit is None:
+                    continue
+
+                # Same step: first in draw order wins, like the sprites list
+                if best is None or hit < best[0] or (
+                    hit == best[0] and self.sprites.index(sprite) < self.sprites.index(best[1])
+                ):
+                    best = hit, sprite
+
+            # Later cells only hold later steps
+            if best is not None and best[0] <= end:
+                break
+
+            step = max(end, step) + 1
+
+        return (best[0] - 1, best[1]) if best else None
+
+    def raycasts(self, rays, distance=500, ignore=None) -> list:
+        """
+            Casts many rays at once, see raycast.
+
+            Rays walk the rect index like raycast. While most sprites are
+            moving and the index is not usable, every ray is tested against
+            every sprite as one array operation instead.
+
+            Args:
+                rays: iterable of (origin, angle)
+                distance: maximum number of steps
+                ignore: sprite no ray can hit
+
+            Returns a list with (steps, sprite) or None for every ray
+        """
+        rays = list(rays)
+        if self.rects.ready():
+            return [self._castCells(origin, _rayStep(angle), distance, ignore) for origin, angle in rays]
+
+        sprites = [sprite for sprite in self.sprites if sprite is not ignore]
+        if not rays or not sprites:
+            return [None] * len(rays)
+
+        rects = np.array([(sprite.x, sprite.y, sprite.width, sprite.height) for sprite in sprites], dtype=np.float64)
+        starts = np.array([origin for origin, _ in rays], dtype=np.float64)
+        steps = np.array([_rayStep(angle) for _, angle in rays], dtype=np.float64)
+
+        def span(start, step, lo, hi):
+            # Array version of _raySpan
+            with np.errstate(divide='ignore', invalid='ignore'):
+                first = np.where(step > 0, np.ceil((lo - start) / step), np.floor((hi - start) / step) + 1)
+                last = np.where(step > 0, np.ceil((hi - start) / step) - 1, np.floor((lo - start) / step))
+
+                def inside(j):
+                    sample = start + j*step
+                    return (lo <= sample) & (sample < hi)
+
+                first = np.where(~inside(first), first + 1, np.where(inside(first - 1), first - 1, first))
+                last = np.where(~inside(last), last - 1, np.where(inside(last + 1), last + 1, last))
+
+            inside = (lo <= start) & (start < hi)
+            first = np.where(step == 0, np.where(inside, -np.inf, np.inf), first)
+            last = np.where(step == 0, np.where(inside, np.inf, -np.inf), last)
+            return first, last
+
+        results = []
+        # Bound the rays x sprites matrices to about a million entries
+        chunk = max(1, (1 << 20) // len(sprites))
+        for i in range(0, len(rays), chunk):
+            x, y = starts[i:i+chunk, :1], starts[i:i+chunk, 1:]
+            dx, dy = steps[i:i+chunk, :1], steps[i:i+chunk, 1:]
+
+            first_x, last_x = span(x, dx, rects[:, 0], rects[:, 0] + rects[:, 2])
+            first_y, last_y = span(y, dy, rects[:, 1], rects[:, 1] + rects[:, 3])
+            first = np.maximum(np.maximum(first_x, first_y), 1)
+            hit = np.where(first <= np.minimum(np.minimum(last_x, last_y), distance), first, np.inf)
+
+            # argmin keeps the first sprite in draw order on ties
+            nearest = hit.argmin(axis=1)
+            for row, col in enumerate(nearest):
+                step = hit[row, col]
+                results.append((int(step) - 1, sprites[col]) if step != np.inf else None)
+
+        return results
+
+    def _drawBackground(self):
+        self._governShaderScale()
+        self._bgTime = 0
+        self._bgPixels = 0
+        step = self.shaderScale
+        shaders = self.backgroundShaders
+
+        if all(getattr(shader, '_frame_independent', False) for shader in shaders):
+            # World space, samples sit on multiples of step so a pan can reuse them
+            ox, oy = -round(self.view[0]), -round(self.view[1])
+            sx, sy = ox // step, oy // step
+            size = (-(-(self.width - 1) // step) + 1, -(-(self.height - 1) // step) + 1)
+
+            key = (tuple(shaders), step, size, make_hashable([uniformArgs(shader, self.uniforms) for shader in shaders]))
+            colors = self._scrollBackground(key, sx, sy, size, step)
+            offset = ((sx * step - ox) * self.res, (sy * step - oy) * self.res)
+
+        else:
+            size = (-(-self.width // step), -(-self.height // step))
+            colors = self._shadeBackground(*coordGrid(*size, step))
+            offset = (0, 0)
+            self._bgKey = self._bgFrame = None
+
+        shader_surface = pygame.Surface(size)
+        pygame.surfarray.blit_array(shader_surface, colors)
+
+        self.width  = self.disp.get_width()  // self.res
+        self.height = self.disp.get_height() // self.res
+
+        # Scale shader surface to screen, each sample covers step cells
+        if step == 1:
+            pygame.transform.scale(shader_surface, (self.width * self.res, self.height * self.res), self.disp)
+        else:
+            self.disp.blit(pygame.transform.scale(shader_surface, (size[0] * step * self.res, size[1] * step * self.res)), offset)
+
+    def _shadeBackground(self, xs, ys) -> np.ndarray:
+        start = time.perf_counter()
+        shaded = shadeGrid(self.backgroundShaders, xs, ys, self.frame, pool=self.shaderPool, uniforms=self.uniforms)
+        self._bgTime += time.perf_counter() - start
+        self._bgPixels += xs.size
+
+        if shaded is None:
+            return np.zeros((*xs.shape, 3), np.uint8)
+
+        colors, drawn = shaded
+        colors[~drawn] = 0
+        return colors
+
+    def _scrollBackground(self, key, sx, sy, size, step) -> np.ndarray:
+        # Keeps last frame's samples, a pan only shades the newly exposed strips
+        w, h = size
+
+        def shade(x0, x1, y0, y1):
+            xs, ys = coordGrid(x1 - x0, y1 - y0)
+            return self._shadeBackground((xs + sx + x0) * step, (ys + sy + y0) * step)
+
+        if key != self._bgKey or self._bgFrame is None:
+            colors = shade(0, w, 0, h)
+
+        else:
+            px, py, prev = self._bgFrame
+            dx, dy = sx - px, sy - py
+
+            if not dx and not dy:
+                return prev
+
+            if abs(dx) >= w or abs(dy) >= h:
+                colors = shade(0, w, 0, h)
+
+            else:
+                colors = np.empty_like(prev)
+                colors[max(-dx, 0):w - max(dx, 0), max(-dy, 0):h - max(dy, 0)] = \
+                    prev[max(dx, 0):w - max(-dx, 0), max(dy, 0):h - max(-dy, 0)]
+
+                # Exposed columns span the full height, exposed rows the columns in between
+                x0, x1 = (w - dx, w) if dx > 0 else (0, -dx)
+                if dx:
+                    colors[x0:x1] = shade(x0, x1, 0, h)
+
+                c0, c1 = (0, w - dx) if dx > 0 else (-dx, w)
+                y0, y1 = (h - dy, h) if dy > 0 else (0, -dy)
+                if dy and c1 > c0:
+                    colors[c0:c1, y0:y1] = shade(c0, c1, y0, y1)
+
+        self._bgKey = key
+        self._bgFrame = (sx, sy, colors)
+        return colors
+
+    def _governShaderScale(self):
+        # Trades background shader resolution for the background's own cost, not the whole frame's
+        if not self.frame_budget:
+            return
+
+        budget = self.frame_budget * backgroundShare
+        still = self.view == self._bgCamera
+        self._bgCamera = self.view
+
+        if still and all(getattr(shader, '_frame_independent', False) for shader in self.backgroundShaders):
+            # The image only changes by refining, one step per frame
+            self.shaderScale = max(self.shaderScale // 2, 1)
+
+        elif self._bgTime > budget:
+            self.shaderScale = min(self.shaderScale * 2, maxShaderScale)
+
+        elif self.shaderScale > 1 and self._bgPixels:
+            # A scroll may only shade strips, estimate a full frame at the finer step
+            step = self.shaderScale // 2
+            pixels = -(-self.width // step) * -(-self.height // step)
+            if self._bgTime / self._bgPixels * pixels < budget:
+                self.shaderScale = step
+
+    def _drawShaded(self, sprite, x, y):
+        # Only shade the part of the sprite that is on screen
+        x0 = max(0, -int(x))
+        y0 = max(0, -int(y))
+        pixels = sprite.pixels[x0:self.width - int(x), y0:self.height - int(y)]
+
+        if pixels.ndim != 3 or not pixels.size:
+            return
+
+        # Screen coordinates of every texel, same as int(x + texel x)
+        texel_xs, texel_ys = coordGrid(*pixels.shape[:2])
+        xs = (texel_xs + x0 + x).astype(int)
+        ys = (texel_ys + y0 + y).astype(int)
+
+        # Batched shaders get world coordinates, the sprite's drawn position plus the texel
+        world = (texel_xs + x0 + x - self.view[0]).astype(int), (texel_ys + y0 + y - self.view[1]).astype(int)
+
+        shaded = shadeGrid(self.spriteShaders, xs, ys, self.frame, pixels[..., :3], (sprite,), uniforms=self.uniforms, batch_grid=world)
+        if shaded is None:
+            return
+
+        # Texels skipped by a shader stay transparent
+        colors, drawn = shaded
+        alpha = drawn * (pixels[..., 3] if pixels.shape[-1] == 4 else 255)
+        surf = arraySurface(np.dstack((colors, alpha.astype(np.uint8))), self.res)
+
+        self.markDirty(self.disp.blit(surf, ((x + x0) * self.res, (y + y0) * self.res)))
+
+    def _clear(self, rect=None):
+        # Restore the background, optionally only inside rect
+        if self.background is None:
+            self.disp.fill(self.bg, rect)
+        elif rect is None:
+            self.disp.blit(self.background, (0, 0))
+        else:
+            self.disp.blit(self.background, rect[:2], rect)
+
+    def markDirty(self, rect, key=None):
+        """
+        Records a region drawn this frame for dirty rect rendering.
+
+        Args:
+            rect: The drawn region in screen pixels.
+            key: Hashable description of what was drawn. Regions drawn with the
+                 same key and rect as last frame are not updated again.
+                 None means the content always changes.
+        """
+        if not self.dirty_rects:
+            return
+
+        try:
+            hash(key)
+        except TypeError:
+            key = None
+
+        rect = pygame.Rect(rect)
+        if rect.width and rect.height:
+            self._drawn.append((key, tuple(rect)))
+
+    def invalidate(self):
+        """Forces a full repaint of the current frame (eg. when the camera scrolls)"""
+        self._fullRepaint = True
+
+    def _present(self):
+        if not self.dirty_rects:
+            pygame.display.flip()
+            return
+
+        # Animated background shaders touch every pixel
+        if self._fullRepaint or self.backgroundShaders:
+            pygame.display.flip()
+
+        else:
+            prev = set(self._prevDrawn)
+            drawn = set(self._drawn)
+
+            rects = [pygame.Rect(rect) for key, rect in self._drawn if key is None or (key, rect) not in prev]
+            rects += [pygame.Rect(rect) for key, rect in self._prevDrawn if key is None or (key, rect) not in drawn]
+
+            # Updating most of the screen piece by piece is slower than a flip
+            if sum(rect.width * rect.height for rect in rects) > self.disp.get_width() * self.disp.get_height() // 2:
+                pygame.display.flip()
+            elif rects:
+                pygame.display.update(rects)
+
+        self._fullRepaint = bool(self.backgroundShaders)
+        self._prevDrawn = self._drawn
+        self._drawn = []
+
+    def warmShaders(self, background=None, sprites=None):
+        """
+            Runs the shader chains once on a tiny grid, so numba compiles jit shaders
+            and fused kernels now instead of on the next frame.
+
+            Args:
+                background: Background chain, defaults to Game.backgroundShaders.
+                sprites: Sprite chain, defaults to Game.spriteShaders. (Skipped without sprites)
+        """
+        background = self.backgroundShaders if background is None else background
+        sprites = self.spriteShaders if sprites is None else sprites
+        xs, ys = coordGrid(2, 2)
+
+        # numba compiles read-only and writable grids separately, frame independent chains get writable ones
+        if background:
+            for grid in ((xs, ys), (xs + 0, ys + 0)):
+                shadeGrid(background, *grid, self.frame, uniforms=self.uniforms, profile=False)
+
+        if sprites and self.sprites:
+            colors = np.zeros((*xs.shape, 3), np.uint8)
+            shadeGrid(sprites, xs + 0, ys + 0, self.frame, colors, (self.sprites[0],), uniforms=self.uniforms, profile=False)
+
+    def shader(self,background = False, vectorized = False, frame_independent = False, uniforms = None):
         """
         Decorator that adds a shader callback to the rendering pipeline.
 
         Allows custom shader effects to be applied during rendering.
 
-        Args: color, x, y, frame, sprite
+        Args: color, x, y, frame, sprite, *uniforms
+
+        Vectorized shaders get whole arrays instead: colors, xs, ys, frame, sprite, *uniforms
+        For sprites their xs, ys are world coordinates, per-pixel sprite shaders keep getting screen cells.
+
+        Background chains where every shader is frame independent get world
+        coordinates and are only recomputed where the camera exposes new cells.
+        Uniforms map names to defaults, values are read from Game.uniforms.
 
         Returns:
             The original callback function, enabling decorator chaining.
         """
         def inner(callback):
+            callback._vectorized = vectorized
+            callback._frame_independent = frame_independent
+            callback._uniforms = uniforms or {}
             if background:
                 self.backgroundShaders.append(callback)
             else:
@@ -776,8 +2928,16 @@ class Game:
         self.running = True
         self.frame = 0
 
+        if self.shaderWatcher:
+            self.shaderWatcher.start()
+
         while self.running:
             start = time.perf_counter()
+
+            if self.shaderWatcher:
+                self.shaderWatcher.apply()
+
+            profiler.startFrame(self.frame)
             if callback:
                 callback(self.frame)
 
@@ -801,20 +2961,34 @@ class Game:
                 if event.type == pygame.QUIT:
                     self.running = False
 
+                elif event.type == pygame.VIDEORESIZE:
+                    self.invalidate()
+
+            # Fixed rate updates
+            if self.tick_rate:
+                self._runTicks()
+
             self._draw()
 
             for callback in self.events.get("frame",[]):
                 callback(self.frame)
 
             if self.frame % 10 == 0:
-                pygame.display.set_caption(f'{self.title} FPS: {round(self.clock.get_fps(),2)} FrameTime: {self.dt*1000:.3f} ms')
+                scale = f' Scale: 1/{self.shaderScale}' if self.shaderScale > 1 else ''
+                pygame.display.set_caption(f'{self.title} FPS: {round(self.clock.get_fps(),2)} FrameTime: {self.dt*1000:.3f} ms{scale}')
 
-            pygame.display.flip()
+            self._present()
 
             self.frame += 1
             self.dt = time.perf_counter() - start
 
             self.clock.tick(self.max_fps)
 
+        if self.shaderPool:
+            self.shaderPool.close()
+
+        if self.shaderWatcher:
+            self.shaderWatcher.stop()
+
 
-__all__ = ["hsl", "distance", "clamp", "clamp_ints", "getFont", "drawText", "textSize", "floodfill", "keyPressed", "modPressed", "cache", "Vec2", "Sprite", "Toast", "eventMap", "Game", "clearStaticShaderCache"]
+__all__ = ["hsl", "distance", "clamp", "clamp_ints", "getFont", "registerFont", "preloadFonts", "drawText", "textSize", "floodfill", "keyPressed", "modPressed", "cache", "Vec2", "sweepRect", "Sprite", "Toast", "eventMap", "Game", "clearStaticShaderCache", "SurfaceCache", "staticShaderCache", "ShaderPool", "shaderRegistry", "ShaderWatcher", "ShaderProfiler", "profiler", "compileExpression"]
@@ -108,7 +108,7 @@ triggers = []
 levelMeta = {"name": "Unnamed", "description": "No description"}
 
 # Initialize the game
-game = gl.Game("Platformer", (800,600), res=8, max_fps=60)
+game = gl.Game("Platformer", (800,600), res=8, max_fps=240, tick_rate=60, dirty_rects=True, watch_shaders=debug, preload_fonts=(10, 12, 13, 14, 15, 16, 18, 20, 30))
 game.id = 'platformer'
 game.version = VERSION
 
@@ -140,7 +140,7 @@ player = gl.Sprite((game.width // 2, game.height // 3*2), player_texture).add(ga
 
 ### [Object()]
 class Object:
-    def __init__(self, type, pos, width, height, attributes, shader = None):
+    def __init__(self, type, pos, width, height, attributes, shader = None, static = False):
         self.type = type
         self.x = int(pos[0])
         self.y = int(pos[1])
@@ -152,7 +152,7 @@ class Object:
 
         if hasattr(self,'gen_texture'):
             self.texture = self.gen_texture()
-            self.sprite = gl.Sprite(self.pos, self.texture).add(game)
+            self.sprite = gl.Sprite(self.pos, self.texture, static=static).add(game)
         else:
             self.texture = [[]]
             self.sprite = gl.Sprite(self.pos, self.texture, self.render).add(game)
@@ -178,7 +178,7 @@ class Platform(Object):
         if attributes is None:
             attributes = {"bounciness": 0.5, "physics": True, "friction": friction}
 
-        super().__init__(ObjectType.platform, pos, width, height, attributes, shader)
+        super().__init__(ObjectType.platform, pos, width, height, attributes, shader, static=True)
         self.sprite.platform = self
 
     def gen_texture(self):
@@ -238,7 +238,7 @@ class Text(Object):
         if self.input:
             self.attributes['text'] = f'{self.textinput.left}|{self.textinput.right}'
 
-        gl.drawText(self.attributes['text'], self.sprite.x*game.res, self.sprite.y*game.res, self.attributes['size'], self.attributes['color'], self.attributes['bold'], self.attributes['italic'])
+        gl.drawText(self.attributes['text'], *game.worldToScreen((self.sprite.x, self.sprite.y)), self.attributes['size'], self.attributes['color'], self.attributes['bold'], self.attributes['italic'])
 
 ### [TriggerType()]
 class TriggerType:
@@ -263,7 +263,7 @@ class TriggerType:
 
             def render(self):
                 if not editor: return
-                gl.pygame.draw.rect(game.disp, color, (self.sprite.x*game.res, self.sprite.y*game.res,self.width*game.res,self.height*game.res))
+                gl.drawRect((*game.worldToScreen((self.sprite.x, self.sprite.y)),self.width*game.res,self.height*game.res), color)
 
             def run(self):
                 run(self)
@@ -285,14 +285,14 @@ class TriggerType:
             def check(self):
                 match self.activation:
                     case TriggerActivationType.vertical:
-                        if self.x < player.x-cx+player.width/2 < self.x+self.width:
+                        if self.x < player.x+player.width/2 < self.x+self.width:
                             self.check_run()
                             self.state = TriggerState.triggered
                         else:
                             self.state = TriggerState.ready
 
                     case TriggerActivationType.horizontal:
-                        if self.y < player.y-cy < self.y+self.height:
+                        if self.y < player.y < self.y+self.height:
                             self.check_run()
                             self.state = TriggerState.triggered
                         else:
@@ -300,7 +300,7 @@ class TriggerType:
 
                     case TriggerActivationType.touch:
                         testRect = gl.pygame.Rect(self.x,self.y,self.width,self.height)
-                        playerRect = gl.pygame.Rect(player.x-cx,player.y-cy,player.width,player.height)
+                        playerRect = gl.pygame.Rect(player.x,player.y,player.width,player.height)
 
                         if testRect.colliderect(playerRect):
                             self.check_run()
@@ -371,26 +371,43 @@ def respawn():
     vel = [0,0]
     startTime = None
 
+def solids():
+    return [
+        sprite for sprite in objects
+        if getattr(sprite, 'object', None) and sprite.object.type == ObjectType.platform
+        and getattr(sprite, 'physics', True)
+    ]
+
+def moveCamera(dx, dy):
+    """Moves the camera, stopping where the player would enter a platform. Returns the contacts"""
+    global cx, cy
+    if noclip:
+        cx += dx
+        cy += dy
+        updateCamera()
+        return []
+
+    # Moving the camera moves the player the other way through the world
+    (mx, my), contacts = player.resolve((-dx, -dy), solids())
+    cx -= mx
+    cy -= my
+    updateCamera()
+    return contacts
+
 def updateCamera():
     global cx,cy,vel,startTime
     if cy <= -100:
         respawn()
         toast('You died.')
 
-    # Player movement
-    player.x = game.width // 2
-    player.y = game.height // 3*2
+    # The player sits at a fixed screen spot, so its place in the world follows the camera
+    player.x = game.width // 2 - cx
+    player.y = game.height // 3*2 - cy
 
+    # The follow offset only shifts the view, objects keep their world positions
     dx = vel[0]*cameraFollowDistance
     dy = vel[1]*(cameraFollowDistance+1)
-
-    player.x -= dx
-    player.y -= dy
-
-    # Object movement
-    for sprite in objects:
-        sprite.x = sprite.pos[0] + cx
-        sprite.y = sprite.pos[1] + cy
+    game.camera[:] = cx - dx, cy - dy
 
 def toast(text):
     gl.Toast((game.width*game.res-5,game.height*game.res-5),text,20)
@@ -399,7 +416,7 @@ def load_level(path):
     global levelMeta, objects, triggers, startTime, finishTime
     for sprite in objects:
         if sprite == player: continue
-        game.sprites.remove(sprite)
+        sprite.remove()
 
     levelMeta, newObjects = Level(path, VERSION).load_level()
 
@@ -433,28 +450,38 @@ def load_level(path):
 def frame(frame):  # sourcery skip: low-code-quality
     # UI Screens
     if screen == Screen.LEVEL_SELECT:
-        game.max_fps = 240
+        game.background = background
         player.hidden = True
         draw_level_select()
 
     elif screen == Screen.PLAY:
-        game.max_fps = 60
+        game.background = None
         player.hidden = False
-        physics()
         if not hide_gui:
             draw_gui()
         return
 
     player.hidden = True
 
+# Physics runs at a fixed 60 ticks a second, frames in between are interpolated
+@game.on('tick')
+def tick(tick):
+    if screen == Screen.PLAY:
+        physics()
+
 def physics():  # sourcery skip: low-code-quality
     global cx,cy, pressedX, jumps, dashes, finishTime, startTime, onGround
     ### [GameLoop/Apply velocity]
     vel[0] = vel[0] * (parachuteResistance if parachute else air_resistance)
     vel[1] = vel[1] * (parachuteResistance if parachute else air_resistance)
 
-    cx += vel[0]
-    cy += vel[1]
+    contacts = moveCamera(vel[0], vel[1])
+
+    # Resting on a platform still counts as touching it
+    if not noclip and not any(normal == (0, -1) for normal, _ in contacts):
+        hit = player.sweep((0, 0.05), solids())
+        if hit and hit[1] == (0, -1):
+            contacts.append(hit[1:])
 
     ## [GameLoop/Check movement]
     pressedX = 0
@@ -481,38 +508,29 @@ def physics():  # sourcery skip: low-code-quality
 
     ### [GameLoop/Collisions]
     onGround = False
-    collisions = player.collides_with(objects)
-    if collisions and not noclip:
-        for sprite in collisions:
-            object = sprite.object
-            if object.type != ObjectType.platform:
-                continue
-
-            if not getattr(sprite, 'physics', True):
-                continue
-
-            onGround = True
+    for normal, sprite in contacts:
+        if sprite.texture[0][0] == (0,255,0) and not finishTime:
+            finishTime = t.time()-startTime
+            toast(f'Level competed in {finishTime} Seconds.')
 
-            vel[0] = vel[0]*getattr(sprite,'friction',friction)
-            vel[1] = vel[1]*getattr(sprite,'friction',friction)
+        # Walls and ceilings only stop movement into them
+        if normal[0]:
+            vel[0] = 0
+            continue
 
-            if sprite.texture[0][0] == (0,255,0) and not finishTime:
-                finishTime = t.time()-startTime
-                toast(f'Level competed in {finishTime} Seconds.')
+        if normal == (0, 1):
+            vel[1] = min(vel[1], 0)
+            continue
 
-            jumps = maxJumps
-            dashes = maxDashes
-            vel[1] *= -sprite.bounciness
-            vel[1] = int(vel[1])
+        onGround = True
 
-            collisions = player.collides_with(objects)
-            for sprite in collisions:
-                if not getattr(sprite, 'physics', True): continue
-                while player.collides_with(sprite):
-                    cy += 0.01
-                    updateCamera()
+        vel[0] = vel[0]*getattr(sprite,'friction',friction)
+        vel[1] = vel[1]*getattr(sprite,'friction',friction)
 
-            cy -= 0.015
+        jumps = maxJumps
+        dashes = maxDashes
+        vel[1] *= -sprite.bounciness
+        vel[1] = int(vel[1])
 
     for trigger in triggers:
         trigger.check()
@@ -639,8 +657,6 @@ def draw_level_select():
     if not levels:
         scan_levels()
 
-    game.disp.blit(background, (0,0))
-
     # Draw level list area background
     list_x = game.width - 33
     list_width = 32
@@ -750,7 +766,7 @@ def mouseDown(event):  # sourcery skip: low-code-quality
     global startPos, grabPos, editedObj, editor, mode, selectedCol, oldTexture
     global selectedObj, typing
     if not editor: return
-    pos = (event['pos'][0]//game.res-cx, event['pos'][1]//game.res-cy)
+    pos = game.screenToWorld(event['pos'])
     pos = round(pos[0]), round(pos[1])
 
     # Object selector
@@ -770,13 +786,11 @@ def mouseDown(event):  # sourcery skip: low-code-quality
 
                     # Floodfill mode
                     if gl.modPressed('ctrl'):
-                        col = sprite.texture[startPos[0]][startPos[1]]
-
-                        gl.floodfill(sprite.texture, startPos, selectedCol, col)
+                        sprite.floodfill(startPos, selectedCol)
 
                     # Pixel mode
                     else:
-                        sprite.texture[startPos[0]][startPos[1]] = selectedCol
+                        sprite.paint(startPos, selectedCol)
                     break
             return
 
@@ -813,36 +827,34 @@ def mouseDown(event):  # sourcery skip: low-code-quality
 
     # Middle
     elif event['button'] == 2:
-       for sprite in objects:
-            if sprite.collidepoint(pos):
-                startPos = sprite.pos[0]+sprite.width-1, sprite.pos[1]+sprite.height-1
-                grabPos = sprite.pos[0]-pos[0], sprite.pos[1]-pos[1]
-                mode = 'edit'
-                editedObj = sprite
-                break
+       for sprite in game.spritesAt(pos, objects):
+           startPos = sprite.pos[0]+sprite.width-1, sprite.pos[1]+sprite.height-1
+           grabPos = sprite.pos[0]-pos[0], sprite.pos[1]-pos[1]
+           mode = 'edit'
+           editedObj = sprite
+           break
 
     # Right
     elif event['button'] == 3:
-        for sprite in objects:
-            if sprite.collidepoint(pos):
-                if paint and editor:
-                    if sprite.object.type != ObjectType.platform: return
-                    startPos = pos[0]-sprite.pos[0], pos[1]-sprite.pos[1]
-                    sprite.texture[startPos[0]][startPos[1]] = game.bg
+        for sprite in game.spritesAt(pos, objects):
+            if paint and editor:
+                if sprite.object.type != ObjectType.platform: return
+                startPos = pos[0]-sprite.pos[0], pos[1]-sprite.pos[1]
+                sprite.paint(startPos, game.bg)
 
-                else:
-                    startPos = pos
-                    grabPos = sprite.pos[0]-pos[0], sprite.pos[1]-pos[1]
-                    mode = 'move'
-                    editedObj = sprite
-                    break
+            else:
+                startPos = pos
+                grabPos = sprite.pos[0]-pos[0], sprite.pos[1]-pos[1]
+                mode = 'move'
+                editedObj = sprite
+                break
 
 @game.on('mouseMove')
 def mouseMove(event):  # sourcery skip: low-code-quality
     global startPos, editedObj, editor, mode, oldTexture
     if not editor: return
     if startPos and editedObj and mode:
-        pos = (event['pos'][0]//game.res-cx,event['pos'][1]//game.res-cy)
+        pos = game.screenToWorld(event['pos'])
         pos = round(pos[0]), round(pos[1])
 
         if mode == 'add':
@@ -871,7 +883,7 @@ def mouseMove(event):  # sourcery skip: low-code-quality
         elif mode == 'edit':
             if editedObj.object.type == ObjectType.text:
                 pos = gl.pygame.mouse.get_pos()
-                size = pos[1] - editedObj.y*game.res
+                size = pos[1] - game.worldToScreen((editedObj.x, editedObj.y))[1]
                 editedObj.text.attributes['size'] = max(int(size),1)
 
             else:
@@ -931,14 +943,14 @@ def keyDown(key):  # sourcery skip: low-code-quality
             elif jumps:
                 jumps -= 1
                 vel[1] += jumpForce
-                cy += vel[1]
+                moveCamera(0, vel[1])
 
         case gl.pygame.K_UP:
             if gl.pygame.key.get_mods(): return
             if jumps:
                 jumps -= 1
                 vel[1] += jumpForce
-                cy += vel[1]
+                moveCamera(0, vel[1])
 
         case gl.pygame.K_s:
             if editor and gl.modPressed('ctrl'):
@@ -959,6 +971,13 @@ def keyDown(key):  # sourcery skip: low-code-quality
                 debug = not debug
                 toast(f'Debug: {debug}')
 
+                # Shader hot reload is a debugging aid, it only runs in debug mode
+                if debug:
+                    game.shaderWatcher = game.shaderWatcher or gl.ShaderWatcher(game)
+                    game.shaderWatcher.start()
+                elif game.shaderWatcher:
+                    game.shaderWatcher.stop()
+
         case gl.pygame.K_q:
             game.running = False
 
@@ -991,15 +1010,14 @@ def keyDown(key):  # sourcery skip: low-code-quality
         case gl.pygame.K_DELETE:
             if not editor: return
             mouse_pos = gl.pygame.mouse.get_pos()
-            pos = (mouse_pos[0]//game.res-cx,mouse_pos[1]//game.res-cy)
+            pos = game.screenToWorld(mouse_pos)
             pos = round(pos[0]), round(pos[1])
 
-            for sprite in objects:
-                if sprite.collidepoint(pos):
-                    game.sprites.remove(sprite)
-                    objects.remove(sprite)
-                    toast('[Editor] Object deleted.')
-                    break
+            for sprite in game.spritesAt(pos, objects):
+                sprite.remove()
+                objects.remove(sprite)
+                toast('[Editor] Object deleted.')
+                break
 
         case gl.pygame.K_c:
             if not editor:
@@ -1007,31 +1025,30 @@ def keyDown(key):  # sourcery skip: low-code-quality
 
             else:
                 mouse_pos = gl.pygame.mouse.get_pos()
-                pos = (mouse_pos[0]//game.res-cx,mouse_pos[1]//game.res-cy)
+                pos = game.screenToWorld(mouse_pos)
                 pos = round(pos[0]), round(pos[1])
 
-                for sprite in objects:
-                    if sprite.collidepoint(pos):
-                        if gl.modPressed('ctrl'):
-                            clipboard = [sprite.pos[0]-pos[0], sprite.pos[1]-pos[1], sprite.width,sprite.height,sprite.object.attributes,sprite.texture]
-                            toast('[Editor] Object copied.')
+                for sprite in game.spritesAt(pos, objects):
+                    if gl.modPressed('ctrl'):
+                        clipboard = [sprite.pos[0]-pos[0], sprite.pos[1]-pos[1], sprite.width,sprite.height,sprite.object.attributes,sprite.texture]
+                        toast('[Editor] Object copied.')
 
-                        else:
-                            setattr(sprite, 'physics', not getattr(sprite, 'physics', True))
-                            sprite.object.attributes['physics'] = getattr(sprite, 'physics')
-                            toast(f'[Editor] Object physics: {sprite.object.attributes['physics']}')
-                        break
+                    else:
+                        setattr(sprite, 'physics', not getattr(sprite, 'physics', True))
+                        sprite.object.attributes['physics'] = getattr(sprite, 'physics')
+                        toast(f'[Editor] Object physics: {sprite.object.attributes['physics']}')
+                    break
 
         case gl.pygame.K_v:
             if not editor: return
             mouse_pos = gl.pygame.mouse.get_pos()
-            pos = (mouse_pos[0]//game.res-cx,mouse_pos[1]//game.res-cy)
+            pos = game.screenToWorld(mouse_pos)
             pos = round(pos[0]), round(pos[1])
 
             if gl.modPressed('ctrl') and clipboard:
                 x,y,width,height,attributes,paint = clipboard
                 object = Platform((pos[0]+x,pos[1]+y),width,height,attributes)
-                object.sprite.updateTexture(paint)
+                object.sprite.updateTexture([column.copy() for column in paint])
                 toast('[Editor] Object pasted.')
 
         case gl.pygame.K_h:
@@ -1069,30 +1086,38 @@ def keyDown(key):  # sourcery skip: low-code-quality
             else:
                 toast('GUI shown.')
 
+        case gl.pygame.K_F3:
+            game.profileShaders(not game.statsOverlay, overlay=True)
+
         case gl.pygame.K_t:
             shader_path = filedialog.askdirectory(initialdir='shaders',mustexist=True,title='Select shader')
 
             if not shader_path: return
 
-            meta, bg_shaders, sprite_shaders = gl.loadShaders(shader_path)
+            result = gl.loadShaders(shader_path, globals={"gl": gl, "cx": cx, "cy": cy})
+            if result[0] == 'Error':
+                print(f'{result[0]}: {result[1]}')
+                return
+
+            meta, bg_shaders, sprite_shaders = result
 
-            for bg_shader, cache in bg_shaders:
+            for bg_shader in bg_shaders:
                 if isinstance(bg_shader, tuple):
                     print(f'{bg_shader[0]}: {bg_shader[1]}')
-                    return
+                    continue
 
-                if cache:
-                    bg_shader = gl.cache()(bg_shader)
                 game.backgroundShaders.append(bg_shader)
 
-            for sprite_shader, cache in sprite_shaders:
+            for sprite_shader in sprite_shaders:
                 if isinstance(sprite_shader, tuple):
                     print(f'{sprite_shader[0]}: {sprite_shader[1]}')
-                    return
-                if cache:
-                    sprite_shader = gl.cache()(sprite_shader)
+                    continue
+
                 game.spriteShaders.append(sprite_shader)
 
+            # Compile jit shaders and their fused kernel while loading, not on the next frame
+            game.warmShaders()
+
     updateCamera()
 
 @game.on('keyUp')
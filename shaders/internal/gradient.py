@@ -44,6 +44,4 @@ def shader(color, x, y, frame):
     g = to_srgb(g_lin)
     b = to_srgb(b_lin)
 
-    print(r)
-
     return gl.clamp_ints(r, g, b)
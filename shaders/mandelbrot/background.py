@@ -1,75 +1,50 @@
 #type:ignore
-from numba import njit
-
-ONE_THIRD = 1.0 / 3.0
-TWO_THIRD = 2.0 / 3.0
-ONE_SIXTH = 1.0 / 6.0
-
-@njit
-def shader(color, x, y, frame, cx, cy, scale):
-    # Apply panning
-    x += cx
-    y += cy
-
-    # Apply zoom
-    x *= scale
-    y *= scale
-
-    # Optimization 1: Early bailout for points likely in the set
-    # Skip detailed calculation if clearly in main bulb or cardioid
-    q = (x - 0.25)**2 + y**2
-    if q*(q + (x - 0.25)) < 0.25*y**2 or (x + 1)**2 + y**2 < 0.0625:
-        return (0, 0, 0)  # Definitely in the set
-
-    c = complex(x, y)
-    z = 0
-
-    def hsl(h, s, l):
-        h_norm = h / 360
-        l_norm = l / 100
-        s_norm = s / 100
-
-        if s_norm == 0.0:
-            rgb_val = l_norm
-            return (int(rgb_val*255), int(rgb_val*255), int(rgb_val*255))
-
-        if l_norm <= 0.5:
-            m2 = l_norm * (1.0 + s_norm)
-        else:
-            m2 = l_norm + s_norm - (l_norm * s_norm)
-
-        m1 = 2.0 * l_norm - m2
-
-        # Define color conversion inline
-        def value(hue):
-            hue = hue % 1.0
-            if hue < ONE_SIXTH:
-                return m1 + (m2-m1)*hue*6.0
-            if hue < 0.5:
-                return m2
-            if hue < TWO_THIRD:
-                return m1 + (m2-m1)*(TWO_THIRD-hue)*6.0
-            return m1
-
-        r = value(h_norm + ONE_THIRD)
-        g = value(h_norm)
-        b = value(h_norm - ONE_THIRD)
-
-        return (int(r*255), int(g*255), int(b*255))
-
-    max_iter = 100
-    # Optimization 3: Escape radius optimization (bail out earlier)
-    for i in range(max_iter):
-        z = z**2 + c
-        if abs(z) > 2:
-            # Optimization 4: Smooth coloring
-            # Use log to create smooth transitions between iteration bands
-            smooth_i = i + 1 - gl.log(gl.log(abs(z))) / gl.log(2)
-            color_value = smooth_i / max_iter
-
-            # Optimization 5: HSL color space for prettier results
-            hue = (color_value * 360) % 360
-            return hsl(hue, 80, 50)
-
-    # Points in the set are black
-    return (0, 0, 0)
+# Whole-frame kernel, compiled by the engine ("jit" in shader.json)
+from colorsys import hls_to_rgb
+import numpy as np
+import math
+
+LOG2 = math.log(2)
+
+# Iteration budget, grows by ITER_PER_ZOOM every time scale halves from BASE_SCALE
+BASE_SCALE = 0.03
+BASE_ITER = 100
+ITER_PER_ZOOM = 50
+MAX_ITER = 4000
+
+# Palette indexed by smooth iteration count, one hue cycle per BASE_ITER iterations
+LUT_SIZE = 1024
+LUT = np.array([[int(c * 255) for c in hls_to_rgb(i / LUT_SIZE, 0.5, 0.8)] for i in range(LUT_SIZE)], np.uint8)
+
+def shader(colors, xs, ys, frame, cx, cy, scale):
+    width, height = xs.shape
+    out = np.zeros((width, height, 3), np.uint8)
+
+    max_iter = BASE_ITER
+    if scale < BASE_SCALE:
+        max_iter = min(MAX_ITER, int(BASE_ITER + ITER_PER_ZOOM * math.log2(BASE_SCALE / scale)))
+
+    for i in range(width):
+        for j in range(height):
+            # Apply panning and zoom
+            x = (xs[i, j] + cx) * scale
+            y = (ys[i, j] + cy) * scale
+
+            # Points in the main cardioid or the period-2 bulb are in the set (black)
+            q = (x - 0.25)**2 + y*y
+            if q*(q + (x - 0.25)) < 0.25*y*y or (x + 1)**2 + y*y < 0.0625:
+                continue
+
+            zr = 0.0
+            zi = 0.0
+            for n in range(max_iter):
+                zr, zi = zr*zr - zi*zi + x, 2*zr*zi + y
+                mag = zr*zr + zi*zi
+
+                if mag > 4.0:
+                    # Smooth coloring, log(log|z|) with |z|^2
+                    smooth = n + 1 - math.log(0.5 * math.log(mag)) / LOG2
+                    out[i, j] = LUT[int(smooth * LUT_SIZE / BASE_ITER) % LUT_SIZE]
+                    break
+
+    return out